@@ -0,0 +1 @@
+"""Воспроизводимые бенчмарки: python -m bench.<имя> (см. docstring модуля)."""
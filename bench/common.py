@@ -0,0 +1,62 @@
+"""Общие помощники бенчмарков."""
+import time
+
+
+def percentiles(samples: list[float], points=(50, 99)) -> dict:
+    """{p: значение} по отсортированной выборке (nearest-rank)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {p: 0.0 for p in points}
+    return {
+        p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points
+    }
+
+
+def format_latency(label: str, samples: list[float], unit: str = "ms") -> str:
+    scale = {"ms": 1e3, "us": 1e6}[unit]
+    pct = percentiles(samples)
+    return (
+        f"{label:<36} n={len(samples):<6} "
+        f"p50={pct[50] * scale:8.2f}{unit} p99={pct[99] * scale:8.2f}{unit}"
+    )
+
+
+class Timer:
+    """with Timer(samples): ... — добавляет длительность блока в samples."""
+
+    def __init__(self, samples: list[float]):
+        self.samples = samples
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self._started)
+        return False
+
+
+def record_fixtures(count: int, seed: int = 1) -> list[dict]:
+    """
+    Записи в формате ответа YClients /records (клиент, услуги, custom_fields),
+    сгенерированные services.fake_yclients без проверки занятости слотов.
+    """
+    import random
+    from datetime import date, datetime, timedelta
+
+    from services.fake_yclients import CLOSE_HOUR, OPEN_HOUR, FakeYClients
+    from services.yclients import STUDIO_TZ
+
+    rnd = random.Random(seed)
+    fake = FakeYClients(records=0, seed=seed)
+    today = date.today()
+    for _ in range(count):
+        day = today + timedelta(days=rnd.randrange(-1, 60))
+        start = STUDIO_TZ.localize(
+            datetime.combine(day, datetime.min.time()).replace(
+                hour=rnd.randrange(OPEN_HOUR, CLOSE_HOUR)
+            )
+        )
+        client = fake._client(f"+7999{rnd.randrange(10**7):07d}")
+        fake._make_record(client, rnd.choice(fake.staff), rnd.choice(fake.services), start)
+    return list(fake.records.values())
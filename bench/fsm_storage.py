@@ -0,0 +1,89 @@
+"""
+FSM storage: SQLiteStorage против MemoryStorage на 50k пользователей.
+
+Run:  python -m bench.fsm_storage --users 50000
+
+Задержка каждого вызова set_state/set_data/get_state/get_data, холодное
+чтение (кэш вытеснен), чтение-промах во время сброса пачки изменений половины
+пользователей и задержка event loop, пока эта пачка пишется.
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bench.common import Timer, format_latency
+from services.fsm_storage import SQLiteStorage
+
+DATA = {"service_id": 101, "date": "2026-10-20", "time": "10:00", "name": "Анна"}
+
+
+async def per_call(storage, keys: list, label: str) -> None:
+    ops = (
+        ("set_state", lambda k: storage.set_state(k, "Booking:choose_time")),
+        ("set_data", lambda k: storage.set_data(k, {**DATA, "user": k.user_id})),
+        ("get_state", lambda k: storage.get_state(k)),
+        ("get_data", lambda k: storage.get_data(k)),
+    )
+    for name, op in ops:
+        samples = []
+        for key in keys:
+            with Timer(samples):
+                await op(key)
+        print(format_latency(f"{label} {name}", samples, unit="us"))
+
+
+async def run(users: int, workdir: Path) -> None:
+    keys = [StorageKey(bot_id=1, chat_id=i, user_id=i) for i in range(users)]
+    await per_call(MemoryStorage(), keys, "memory")
+
+    storage = SQLiteStorage(workdir / "fsm.sqlite3", flush_interval=0.2)
+    await per_call(storage, keys, "sqlite")
+    while storage.stats()["dirty"] or storage._flushing:
+        await asyncio.sleep(0.05)
+
+    storage._cache.clear()
+    samples = []
+    for key in keys:
+        with Timer(samples):
+            await storage.get_data(key)
+    print(format_latency("sqlite cold get_data", samples, unit="us"))
+
+    # Пачка изменений половины пользователей; во время её записи другая
+    # половина читается промахами кэша — из базы, а не из _flushing
+    writers, readers = keys[: users // 2], keys[users // 2:]
+    for key in writers:
+        await storage.set_state(key, "Booking:confirm")
+    storage._cache.clear()
+    miss, lags = [], []
+    i = 0
+    while storage._dirty or storage._flushing:
+        with Timer(miss):
+            await storage.get_state(readers[i % len(readers)])
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+        i += 1
+    print(format_latency(f"sqlite miss during {len(writers)} flush", miss, unit="us"))
+    print(format_latency("loop lag during flush", lags))
+    await storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FSM storage benchmark")
+    parser.add_argument("--users", type=int, default=50000)
+    args = parser.parse_args()
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        asyncio.run(run(args.users, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Декодирование страницы /records: stdlib json против orjson, в цикле и в потоке.
+
+Run:  python -m bench.json_decode --page-size 200
+
+Тело ответа — страница записей services.fake_yclients (как отдаёт YClients).
+Последняя строка — задержка event loop, пока большие ответы декодируются
+так, как это делает YClientsService._decode (в потоке от LARGE_BODY_BYTES).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from bench.common import Timer, format_latency, record_fixtures
+from services.yclients import LARGE_BODY_BYTES, YClientsService
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def page_body(page_size: int) -> bytes:
+    records = record_fixtures(page_size)
+    return json.dumps(
+        {"success": True, "data": records, "meta": {"count": len(records)}},
+        ensure_ascii=False,
+    ).encode()
+
+
+async def loop_lag(service: YClientsService, body: bytes, pages: int) -> list[float]:
+    """Задержка тика 1 мс, пока декодируются pages страниц подряд."""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for _ in range(pages):
+        await service._decode(body)
+    done.set()
+    await task
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON decode benchmark")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    body = page_body(args.page_size)
+    print(f"body: {len(body) / 1024:.0f} KiB, {args.page_size} records "
+          f"(LARGE_BODY_BYTES = {LARGE_BODY_BYTES // 1024} KiB)")
+    decoders = [("json.loads", json.loads)]
+    if orjson is not None:
+        decoders.append(("orjson.loads", orjson.loads))
+    for label, loads in decoders:
+        samples = []
+        for _ in range(args.runs):
+            with Timer(samples):
+                loads(body)
+        print(format_latency(label, samples))
+
+    for label, loads in decoders:
+        service = YClientsService("", "", "", json_decoder=loads)
+        lags = asyncio.run(loop_lag(service, body, args.runs))
+        print(format_latency(f"loop lag, _decode via {label}", lags))
+
+
+if __name__ == "__main__":
+    main()
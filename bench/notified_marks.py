@@ -0,0 +1,63 @@
+"""
+Стоимость одной отметки notified_store при 100k существующих отметок:
+журнал с фоновым сворачиванием против полной перезаписи JSON (как было).
+
+Run:  python -m bench.notified_marks --entries 100000 --marks 20000
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bench.common import Timer, format_latency
+from services import notified_store
+
+
+def full_rewrite(store: dict, path: Path, key: str) -> None:
+    """Старый mark_notified: весь словарь в tmp и перенос поверх снимка."""
+    store[key] = True
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(store), encoding="utf-8")
+    shutil.move(str(tmp), str(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="notified_store mark benchmark")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--marks", type=int, default=20000)
+    parser.add_argument("--rewrite-marks", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    expires = time.time() + 86400
+    snapshot = {f"{i}:reminder": expires for i in range(args.entries)}
+
+    legacy_path = workdir / "legacy.json"
+    legacy = dict.fromkeys(snapshot, True)
+    samples = []
+    for i in range(args.rewrite_marks):
+        with Timer(samples):
+            full_rewrite(legacy, legacy_path, f"{args.entries + i}:feedback")
+    print(format_latency(f"full JSON rewrite @{args.entries}", samples))
+
+    store_file = workdir / "notified.json"
+    store_file.write_text(json.dumps(snapshot), encoding="utf-8")
+    notified_store.set_path(store_file)
+    at = datetime.now() + timedelta(hours=1)
+    samples = []
+    started = time.perf_counter()
+    for i in range(args.marks):
+        with Timer(samples):
+            notified_store.mark_notified(args.entries + i, "feedback", at=at)
+    total = time.perf_counter() - started
+    print(format_latency(f"append log @{args.entries}", samples, unit="us"))
+    print(f"append log: {total / args.marks * 1e6:.1f} us/mark on average over "
+          f"{args.marks} marks, compactions included (COMPACT_EVERY={notified_store.COMPACT_EVERY})")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Разбор записей YClients в Record: один проход нормализации на запись.
+
+Run:  python -m bench.record_parse --records 10000
+"""
+import argparse
+import time
+
+from bench.common import record_fixtures
+from services.yclients import Record
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record.from_api micro-benchmark")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raws = record_fixtures(args.records)
+    records = [Record.from_api(raw) for raw in raws]
+    assert all(r is not None and r.telegram_id for r in records)
+    states = [r.to_dict() for r in records]
+
+    n = len(raws)
+    for label, func in (
+        ("Record.from_api", lambda: [Record.from_api(raw) for raw in raws]),
+        ("Record.to_dict (FSM state)", lambda: [r.to_dict() for r in records]),
+        ("Record.from_dict", lambda: [Record.from_dict(d) for d in states]),
+    ):
+        total = best_of(args.repeat, func)
+        print(f"{label:<28} {n} records: {total * 1e3:7.1f} ms  ({total / n * 1e6:.1f} us/record)")
+
+
+if __name__ == "__main__":
+    main()
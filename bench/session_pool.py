@@ -0,0 +1,54 @@
+"""
+Задержка get_services/get_staff: общий пул соединений против сессии на запрос.
+
+Run:  python -m bench.session_pool --calls 300 --latency 0.005
+
+Сервер — services.fake_yclients в том же процессе. Кэш каталога обходится
+(вызываются _fetch_*), чтобы каждый вызов шёл в сеть. Режим «сессия на
+запрос» воспроизводит старое поведение: пул закрывается после каждого вызова.
+Против локального HTTP без TLS выигрыш меньше, чем против api.yclients.com.
+"""
+import argparse
+import asyncio
+
+from bench.common import Timer, format_latency
+from services.fake_yclients import FakeYClients, start_server
+from services.yclients import YClientsService
+
+
+async def measure(service: YClientsService, calls: int, reuse: bool) -> list[float]:
+    samples = []
+    for i in range(calls):
+        fetch = service._fetch_services if i % 2 == 0 else service._fetch_staff
+        with Timer(samples):
+            await fetch()
+        if not reuse:
+            await service.close()
+    return samples
+
+
+async def run(calls: int, latency: float) -> None:
+    runner, base_url = await start_server(FakeYClients(latency=latency, records=0))
+    try:
+        for reuse, label in ((False, "session per request"), (True, "shared pool")):
+            service = YClientsService(
+                "partner", "user", 1, base_url=base_url, rate_limit=1e6, rate_burst=10**6
+            )
+            await measure(service, 10, reuse)  # прогрев
+            samples = await measure(service, calls, reuse)
+            await service.close()
+            print(format_latency(label, samples))
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка fake-сервера, с")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
 """Pilates Guru Telegram Bot - entry point."""
 import asyncio
 import logging
+import time
+from pathlib import Path
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
-from config import BOT_TOKEN, YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, YCLIENTS_COMPANY_ID
+from config import (
+    BOT_TOKEN,
+    DATA_DIR,
+    METRICS_HOST,
+    METRICS_PORT,
+    NOTIFICATION_CLAIMS_FILE,
+    NOTIFIED_DURABILITY,
+    NOTIFIED_FSYNC_INTERVAL,
+)
 from handlers import setup_handlers
-from services.scheduler import start_scheduler
-from services.yclients import YClientsService
+from services import notified_store
+from services.fsm_storage import SQLiteStorage
+from services.metrics import METRICS, start_metrics_server
+from services.record_store import RecordStore
+from services.scheduler import start_scheduler, stop_scheduler
+from services.telegram_sender import close_senders
+from services.yclients import get_yclients
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,40 +33,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Критичные шаги запуска (до polling) и фоновый прогрев кэшей, секунды
+STARTUP_DEADLINE = 10
+WARM_UP_DEADLINE = 30
+
+
+async def _timed(name: str, coro, deadline: float):
+    """Выполнить шаг запуска с дедлайном и залогировать время. None при ошибке."""
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(coro, deadline)
+    except Exception as e:
+        logger.warning(
+            f"Startup: {name} — ошибка за {time.perf_counter() - started:.2f} с: {e!r}"
+        )
+        return None
+    logger.info(f"Startup: {name} — {time.perf_counter() - started:.2f} с")
+    return result
+
 
 async def main():
     """Run the bot."""
-    yclients = YClientsService(
-        YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, str(YCLIENTS_COMPANY_ID)
+    data_dir = Path(DATA_DIR)
+    notified_store.set_path(data_dir / "notified.json")
+    yclients = get_yclients()
+    record_store = RecordStore(data_dir / "records.sqlite3")
+    yclients.attach_record_store(record_store)
+    await yclients.start()
+
+    metrics_runner = None
+    if METRICS_PORT:
+        METRICS.register_collector(yclients.collect_metrics)
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+    bot = Bot(
+        token=BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
+    )
+
+    # Прогрев каталога и свободных дат — в фоне, polling его не ждёт
+    warm_up = asyncio.create_task(
+        _timed("прогрев кэша YClients", yclients.warm_up(), WARM_UP_DEADLINE)
+    )
+
+    # Критичные шаги — параллельно, с общим дедлайном
+    ok, _ = await asyncio.gather(
+        _timed("проверка YClients", yclients.check_connection(), STARTUP_DEADLINE),
+        # Set premium command menu
+        _timed(
+            "команды бота",
+            bot.set_my_commands([
+                BotCommand(command="start", description="Главное меню"),
+                BotCommand(command="book", description="Запись на тренировку"),
+                BotCommand(command="my_bookings", description="Мои записи"),
+                BotCommand(command="prices", description="Услуги и цены"),
+                BotCommand(command="help", description="Связь с администратором")
+            ]),
+            STARTUP_DEADLINE,
+        ),
     )
-    ok = await yclients.check_connection()
     if ok:
         logger.info("YClients подключён")
     else:
         logger.warning("YClients недоступен — работаем с fallback данными")
 
-    bot = Bot(
-        token=BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
-    )
-    
-    # Set premium command menu
-    await bot.set_my_commands([
-        BotCommand(command="start", description="Главное меню"),
-        BotCommand(command="book", description="Запись на тренировку"),
-        BotCommand(command="my_bookings", description="Мои записи"),
-        BotCommand(command="prices", description="Услуги и цены"),
-        BotCommand(command="help", description="Связь с администратором")
-    ])
-    
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=SQLiteStorage(data_dir / "fsm.sqlite3"))
     dp.include_router(setup_handlers())
 
     async def on_startup():
-        start_scheduler(bot, yclients)
+        notified_store.start_writer(NOTIFIED_DURABILITY, NOTIFIED_FSYNC_INTERVAL)
+        start_scheduler(
+            bot, yclients,
+            job_store_file=data_dir / "scheduler.sqlite3",
+            claims_file=NOTIFICATION_CLAIMS_FILE,
+        )
+
+    async def on_shutdown():
+        warm_up.cancel()
+        stop_scheduler()
+        await close_senders()
+        await notified_store.close()
+        await yclients.close()
+        record_store.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     logger.info("Starting Pilates Guru Bot...")
-    await dp.start_polling(bot, on_startup=on_startup)
+    await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
@@ -17,6 +17,26 @@ BOT_TOKEN = _get_env("BOT_TOKEN")
 YCLIENTS_TOKEN = os.getenv("YCLIENTS_TOKEN", "")  # partner token
 YCLIENTS_USER_TOKEN = os.getenv("YCLIENTS_USER_TOKEN", "")
 YCLIENTS_COMPANY_ID = os.getenv("YCLIENTS_COMPANY_ID", "")
+# Можно направить на локальный стенд: python -m services.fake_yclients
+YCLIENTS_BASE_URL = os.getenv("YCLIENTS_BASE_URL", "https://api.yclients.com/api/v1")
+YCLIENTS_POOL_LIMIT = int(os.getenv("YCLIENTS_POOL_LIMIT", "20"))
+YCLIENTS_POOL_LIMIT_PER_HOST = int(os.getenv("YCLIENTS_POOL_LIMIT_PER_HOST", "10"))
+YCLIENTS_RATE_LIMIT = float(os.getenv("YCLIENTS_RATE_LIMIT", "5"))  # запросов/с
+YCLIENTS_RATE_BURST = int(os.getenv("YCLIENTS_RATE_BURST", "10"))
+# Экспорт метрик Prometheus (GET /metrics); 0 — выключен
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Отметки об отправленных уведомлениях: "batch" — fsync каждой пачки,
+# "interval" — fsync не реже NOTIFIED_FSYNC_INTERVAL секунд
+NOTIFIED_DURABILITY = os.getenv("NOTIFIED_DURABILITY", "batch")
+NOTIFIED_FSYNC_INTERVAL = float(os.getenv("NOTIFIED_FSYNC_INTERVAL", "1"))
+# Файлы реплики: копия записей, задания планировщика, отметки уведомлений, FSM.
+# Каждой реплике — свой каталог: общий job store и журнал отметок ломаются
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# Захваты уведомлений — один файл на все реплики одного хоста (локальный диск,
+# общий том контейнеров). Сетевые ФС не поддерживаются: SQLite WAL на них
+# не атомарен, ClaimStore откажется запускаться
+NOTIFICATION_CLAIMS_FILE = os.getenv("NOTIFICATION_CLAIMS_FILE", "data/notified.sqlite3")
 YOOKASSA_SHOP_ID = os.getenv("YOOKASSA_SHOP_ID", "")
 YOOKASSA_SECRET_KEY = os.getenv("YOOKASSA_SECRET_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
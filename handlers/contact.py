@@ -1,6 +1,5 @@
 """Contact sharing handler — onboarding flow with YClients lookup."""
 import logging
-import re
 
 from aiogram import Router, F
 from aiogram.types import Message
@@ -8,16 +7,18 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import ReplyKeyboardRemove
 
-from config import YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, YCLIENTS_COMPANY_ID
-from services.yclients import YClientsService, YClientsNotConfigured
+from services.yclients import (
+    YClientsNotConfigured,
+    YClientsUnavailable,
+    get_yclients,
+    normalize_phone,
+)
 from handlers.start import get_premium_reply_keyboard
 from services.ai_agent import get_new_client_welcome
 
 router = Router(name="contact")
 
-yclients = YClientsService(
-    YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, str(YCLIENTS_COMPANY_ID)
-)
+yclients = get_yclients()
 
 
 class NewClientStates(StatesGroup):
@@ -26,16 +27,6 @@ class NewClientStates(StatesGroup):
     injuries = State()
 
 
-def _normalize_phone(phone: str) -> str:
-    """Normalize phone for YClients lookup."""
-    digits = re.sub(r"\D", "", str(phone or ""))
-    if len(digits) == 10 and digits[0] in "789":
-        return "+7" + digits
-    if len(digits) == 11 and digits[0] == "7":
-        return "+" + digits
-    return "+" + digits if digits else ""
-
-
 @router.message(F.contact)
 async def on_contact_shared(message: Message, state: FSMContext):
     """Handle shared contact — lookup in YClients, existing vs new client flow."""
@@ -43,7 +34,7 @@ async def on_contact_shared(message: Message, state: FSMContext):
         await message.answer("Не удалось получить номер. Попробуйте ещё раз.")
         return
 
-    phone = _normalize_phone(message.contact.phone_number)
+    phone = normalize_phone(message.contact.phone_number)
     await state.update_data(phone=phone)
     await message.answer("Проверяю...", reply_markup=ReplyKeyboardRemove())
 
@@ -52,6 +43,9 @@ async def on_contact_shared(message: Message, state: FSMContext):
     except YClientsNotConfigured:
         logging.warning("YClients not configured, treating as new client")
         client = None
+    except YClientsUnavailable as e:
+        logging.warning("YClients unavailable, treating as new client: %s", e)
+        client = None
     except Exception as e:
         logging.exception("YClients get_client_by_phone error: %s", e)
         client = None
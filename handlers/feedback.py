@@ -6,6 +6,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from config import ADMIN_TG_ID
+from services.telegram_sender import get_sender
 
 router = Router()
 
@@ -117,9 +118,9 @@ async def receive_bad_feedback(message: Message, state: FSMContext):
             f"💬 *Отзыв:*\n{message.text}"
         )
         try:
-            await message.bot.send_message(
-                chat_id=ADMIN_TG_ID,
-                text=admin_text,
+            await get_sender(message.bot).send(
+                ADMIN_TG_ID,
+                admin_text,
                 parse_mode="Markdown",
             )
         except Exception as e:
@@ -1,5 +1,6 @@
 """Manage booking: cancel or reschedule records."""
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 
 import pytz
 from aiogram import Router, F
@@ -8,17 +9,19 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from config import YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, YCLIENTS_COMPANY_ID
 from data.studio_info import STUDIO
-from services.yclients import YClientsNotConfigured, YClientsService
+from services.yclients import (
+    Record,
+    YClientsNotConfigured,
+    YClientsUnavailable,
+    get_yclients,
+)
 
 MSK = pytz.timezone("Europe/Moscow")
 UNAVAILABLE_MSG = f"Онлайн-запись временно недоступна. Позвоните нам: {STUDIO['phone']}"
 
 router = Router(name="manage_booking")
-yclients = YClientsService(
-    YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, str(YCLIENTS_COMPANY_ID)
-)
+yclients = get_yclients()
 
 
 class ManageStates(StatesGroup):
@@ -28,43 +31,30 @@ class ManageStates(StatesGroup):
     choose_new_date = State()
     choose_new_time = State()
     confirm_reschedule = State()
+    choose_recurring_count = State()
+    confirm_recurring = State()
 
 
-def _parse_record_datetime(record: dict) -> datetime | None:
-    """Parse record datetime to MSK-aware datetime."""
-    dt_val = record.get("datetime") or record.get("date") or record.get("visit_start")
-    if not dt_val:
-        return None
-    if isinstance(dt_val, (int, float)):
-        return datetime.fromtimestamp(dt_val, tz=MSK)
-    s = str(dt_val).replace("Z", "").replace("+00:00", "").strip()
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S%z"):
-        try:
-            dt = datetime.strptime(s[:19], fmt[:19].replace("%z", ""))
-            if dt.tzinfo is None:
-                dt = MSK.localize(dt)
-            return dt
-        except (ValueError, TypeError):
-            continue
-    return None
+# Варианты «повторять слот N недель» (абонементы на 4 и 8 занятий)
+RECURRING_COUNTS = (4, 8)
 
 
-def _format_record_label(record: dict) -> str:
-    """Format record for button: '{date} {time} — {trainer} ({service})'."""
-    dt = _parse_record_datetime(record)
-    date_str = dt.strftime("%d.%m") if dt else "?"
-    time_str = dt.strftime("%H:%M") if dt else "?"
+def _state_record(data: dict) -> Record | None:
+    """Выбранная запись из FSM state (хранится как Record.to_dict())."""
+    stored = data.get("manage_record")
+    return Record.from_dict(stored) if stored else None
 
-    staff = record.get("staff") or {}
-    trainer = staff.get("name") if isinstance(staff, dict) else str(staff)
-    if not trainer:
-        trainer = record.get("staff_name", "Тренер")
 
-    services = record.get("services") or []
-    svc = (services[0] if services else {})
-    service_title = svc.get("title") or svc.get("booking_title", "Занятие") if isinstance(svc, dict) else "Занятие"
+def _record_date(record: Record | None) -> str | None:
+    """Дата записи в формате YYYY-MM-DD (для сброса кэша слотов)."""
+    return record.start.strftime("%Y-%m-%d") if record else None
 
-    return f"{date_str} {time_str} — {trainer} ({service_title})"
+
+def _format_record_label(record: Record) -> str:
+    """Format record for button: '{date} {time} — {trainer} ({service})'."""
+    trainer = record.staff_name or "Тренер"
+    service_title = record.service_title or "Занятие"
+    return f"{record.start:%d.%m %H:%M} — {trainer} ({service_title})"
 
 
 def _get_main_menu_button():
@@ -89,12 +79,13 @@ async def show_my_records(callback: CallbackQuery, state: FSMContext):
 
     try:
         records = await yclients.get_client_records(phone)
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         await callback.message.edit_text(UNAVAILABLE_MSG, reply_markup=_get_main_menu_button())
         return
     except Exception as e:
+        logging.exception("YClients get_client_records error: %s", e)
         await callback.message.edit_text(
-            f"Ошибка загрузки записей: {e}",
+            "Не удалось загрузить записи. Попробуйте позже.",
             reply_markup=_get_main_menu_button(),
         )
         return
@@ -108,15 +99,12 @@ async def show_my_records(callback: CallbackQuery, state: FSMContext):
 
     builder = InlineKeyboardBuilder()
     for r in records:
-        rid = r.get("id")
-        if rid is None:
-            continue
         label = _format_record_label(r)[:64]
-        builder.button(text=label, callback_data=f"manage:{rid}")
+        builder.button(text=label, callback_data=f"manage:{r.id}")
     builder.button(text="Главное меню", callback_data="menu:main")
     builder.adjust(1)
 
-    await state.update_data(manage_records=records)
+    await state.update_data(manage_records=[r.to_dict() for r in records])
     await state.set_state(ManageStates.choose_record)
     await callback.message.edit_text(
         "Выберите запись для отмены или переноса:",
@@ -139,10 +127,10 @@ async def show_record_details(callback: CallbackQuery, state: FSMContext):
     record_id = int(callback.data.split(":")[1])
     data = await state.get_data()
     records = data.get("manage_records", [])
-    record = next((r for r in records if r.get("id") == record_id), None)
+    stored = next((r for r in records if r.get("id") == record_id), None)
 
     await callback.answer()
-    if not record:
+    if not stored:
         await callback.message.edit_text(
             "Запись не найдена.",
             reply_markup=_get_main_menu_button(),
@@ -150,27 +138,14 @@ async def show_record_details(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
 
-    dt = _parse_record_datetime(record)
-    hours_left = (
-        (dt - datetime.now(MSK)).total_seconds() / 3600
-        if dt
-        else 999
-    )
-
-    staff = record.get("staff") or {}
-    trainer = staff.get("name") if isinstance(staff, dict) else record.get("staff_name", "Тренер")
-    services = record.get("services") or []
-    svc = services[0] if services else {}
-    service_title = svc.get("title") or svc.get("booking_title", "Занятие") if isinstance(svc, dict) else "Занятие"
-
-    date_str = dt.strftime("%d.%m.%Y") if dt else "?"
-    time_str = dt.strftime("%H:%M") if dt else "?"
+    record = Record.from_dict(stored)
+    hours_left = (record.start - datetime.now(MSK)).total_seconds() / 3600
 
     text = (
-        f"📅 *Дата:* {date_str}\n"
-        f"🕐 *Время:* {time_str}\n"
-        f"👤 *Тренер:* {trainer}\n"
-        f"📋 *Услуга:* {service_title}\n\n"
+        f"📅 *Дата:* {record.start:%d.%m.%Y}\n"
+        f"🕐 *Время:* {record.start:%H:%M}\n"
+        f"👤 *Тренер:* {record.staff_name or 'Тренер'}\n"
+        f"📋 *Услуга:* {record.service_title or 'Занятие'}\n\n"
     )
     if hours_left < 20:
         text += (
@@ -182,27 +157,16 @@ async def show_record_details(callback: CallbackQuery, state: FSMContext):
     builder = InlineKeyboardBuilder()
     builder.button(text="❌ Отменить запись", callback_data="manage_cancel:1")
     builder.button(text="🔄 Перенести запись", callback_data="manage_reschedule:1")
+    builder.button(text="🔁 Этот слот каждую неделю", callback_data="manage_recurring:1")
     builder.button(text="Главное меню", callback_data="menu:main")
     builder.adjust(1)
 
-    staff_id = record.get("staff_id") or (staff.get("id") if isinstance(staff, dict) else None)
-    service_id = svc.get("id") if isinstance(svc, dict) else record.get("service_id")
-    # YClients records may nest in appointments
-    if not staff_id or not service_id:
-        appointments = record.get("appointments") or [record]
-        app = appointments[0] if appointments else {}
-        staff_id = staff_id or app.get("staff_id") or (app.get("staff") or {}).get("id")
-        svcs = app.get("services") or app.get("service_ids") or []
-        if svcs:
-            s0 = svcs[0]
-            service_id = service_id or (s0 if isinstance(s0, int) else (s0.get("id") if isinstance(s0, dict) else None))
-
     await state.update_data(
         manage_record_id=record_id,
-        manage_record=record,
+        manage_record=stored,
         manage_hours_left=hours_left,
-        manage_staff_id=staff_id,
-        manage_service_id=service_id,
+        manage_staff_id=record.staff_id,
+        manage_service_id=record.service_id,
     )
     await state.set_state(ManageStates.choose_action)
     await callback.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="Markdown")
@@ -254,15 +218,20 @@ async def do_cancel(callback: CallbackQuery, state: FSMContext):
         )
 
     try:
-        success, msg = await yclients.cancel_record(record_id)
+        success, msg = await yclients.cancel_record(
+            record_id,
+            staff_id=data.get("manage_staff_id"),
+            date=_record_date(_state_record(data)),
+        )
         if success:
             text = f"✅ {msg}\n\nЗапись успешно отменена."
         else:
             text = f"❌ Не удалось отменить: {msg}"
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         text = UNAVAILABLE_MSG
     except Exception as e:
-        text = f"Ошибка при отмене: {e}"
+        logging.exception("YClients cancel_record error: %s", e)
+        text = "Не удалось отменить запись. Попробуйте позже или свяжитесь с администратором."
 
     await callback.message.edit_text(text, reply_markup=_get_main_menu_button())
 
@@ -297,13 +266,14 @@ async def start_reschedule(callback: CallbackQuery, state: FSMContext):
 
     try:
         dates = await yclients.get_available_dates(staff_id, service_id)
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         await callback.message.edit_text(UNAVAILABLE_MSG, reply_markup=_get_main_menu_button())
         await state.clear()
         return
     except Exception as e:
+        logging.exception("YClients get_available_dates error: %s", e)
         await callback.message.edit_text(
-            f"Ошибка загрузки дат: {e}",
+            "Не удалось загрузить даты. Попробуйте позже.",
             reply_markup=_get_main_menu_button(),
         )
         await state.clear()
@@ -348,13 +318,14 @@ async def chose_reschedule_date(callback: CallbackQuery, state: FSMContext):
 
     try:
         times = await yclients.get_available_times(staff_id, date_str, service_id)
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         await callback.message.edit_text(UNAVAILABLE_MSG, reply_markup=_get_main_menu_button())
         await state.clear()
         return
     except Exception as e:
+        logging.exception("YClients get_available_times error: %s", e)
         await callback.message.edit_text(
-            f"Ошибка загрузки времени: {e}",
+            "Не удалось загрузить время. Попробуйте позже.",
             reply_markup=_get_main_menu_button(),
         )
         await state.clear()
@@ -427,12 +398,9 @@ async def chose_reschedule_time(callback: CallbackQuery, state: FSMContext):
     await state.set_state(ManageStates.confirm_reschedule)
     await callback.answer()
 
-    record = data.get("manage_record", {})
-    staff = record.get("staff") or {}
-    trainer = staff.get("name") if isinstance(staff, dict) else "Тренер"
-    services = record.get("services") or []
-    svc = services[0] if services else {}
-    service_title = svc.get("title") or "Занятие" if isinstance(svc, dict) else "Занятие"
+    record = _state_record(data)
+    trainer = (record.staff_name if record else "") or "Тренер"
+    service_title = (record.service_title if record else "") or "Занятие"
 
     try:
         dt = datetime.strptime(new_datetime_str, "%Y-%m-%d %H:%M:%S")
@@ -476,15 +444,143 @@ async def do_reschedule(callback: CallbackQuery, state: FSMContext):
 
     try:
         success, msg = await yclients.reschedule_record(
-            record_id, staff_id, service_id, new_datetime_str
+            record_id,
+            staff_id,
+            service_id,
+            new_datetime_str,
+            old_date=_record_date(_state_record(data)),
         )
         if success:
             text = f"✅ {msg}\n\nЗапись перенесена."
         else:
             text = f"❌ Не удалось перенести: {msg}"
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         text = UNAVAILABLE_MSG
     except Exception as e:
-        text = f"Ошибка при переносе: {e}"
+        logging.exception("YClients reschedule_record error: %s", e)
+        text = "Не удалось перенести запись. Попробуйте позже или свяжитесь с администратором."
 
     await callback.message.edit_text(text, reply_markup=_get_main_menu_button())
+
+
+# --- Recurring slot flow (абонемент) ---
+
+def _recurring_datetimes(record: Record, count: int) -> list[datetime]:
+    """Тот же день недели и время на count недель после записи."""
+    return [record.start + timedelta(weeks=week) for week in range(1, count + 1)]
+
+
+@router.callback_query(ManageStates.choose_action, F.data == "manage_recurring:1")
+async def start_recurring(callback: CallbackQuery, state: FSMContext):
+    """Ask how many weekly sessions to book in the same slot."""
+    data = await state.get_data()
+    record = _state_record(data)
+    await callback.answer()
+
+    if not record or not record.staff_id or not record.service_id or not record.client_phone:
+        await callback.message.edit_text(
+            "Не удалось определить данные записи для абонемента.",
+            reply_markup=_get_main_menu_button(),
+        )
+        await state.clear()
+        return
+
+    builder = InlineKeyboardBuilder()
+    for count in RECURRING_COUNTS:
+        builder.button(text=f"{count} занятий", callback_data=f"recurring_count:{count}")
+    builder.button(text="❌ Отмена", callback_data="menu:my_records")
+    builder.adjust(len(RECURRING_COUNTS), 1)
+
+    await state.set_state(ManageStates.choose_recurring_count)
+    await callback.message.edit_text(
+        f"Записать вас на {record.start:%H:%M} каждый такой же день недели "
+        f"к тренеру {record.staff_name or 'Тренер'}?\n\nСколько занятий?",
+        reply_markup=builder.as_markup(),
+    )
+
+
+@router.callback_query(ManageStates.choose_recurring_count, F.data.startswith("recurring_count:"))
+async def chose_recurring_count(callback: CallbackQuery, state: FSMContext):
+    """Show the dates that will be booked and ask for confirmation."""
+    count = int(callback.data.split(":")[1])
+    data = await state.get_data()
+    record = _state_record(data)
+    await callback.answer()
+
+    if count not in RECURRING_COUNTS or not record:
+        await callback.message.edit_text(
+            "Ошибка: неполные данные. Попробуйте снова.",
+            reply_markup=_get_main_menu_button(),
+        )
+        await state.clear()
+        return
+
+    dates = "\n".join(f"• {dt:%d.%m.%Y в %H:%M}" for dt in _recurring_datetimes(record, count))
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✅ Да, записать", callback_data="confirm_recurring_yes")
+    builder.button(text="❌ Отмена", callback_data="menu:my_records")
+    builder.adjust(1)
+
+    await state.update_data(recurring_count=count)
+    await state.set_state(ManageStates.confirm_recurring)
+    await callback.message.edit_text(
+        f"Будут созданы записи:\n\n{dates}\n\n"
+        f"👤 Тренер: {record.staff_name or 'Тренер'}\n"
+        f"📋 Услуга: {record.service_title or 'Занятие'}\n\n"
+        f"Подтвердить?",
+        reply_markup=builder.as_markup(),
+    )
+
+
+@router.callback_query(ManageStates.confirm_recurring, F.data == "confirm_recurring_yes")
+async def do_recurring(callback: CallbackQuery, state: FSMContext):
+    """Book all weekly sessions in one batch and report per-date results."""
+    data = await state.get_data()
+    record = _state_record(data)
+    count = data.get("recurring_count", 0)
+
+    await callback.answer()
+    await state.clear()
+
+    if not record or not count:
+        await callback.message.edit_text(
+            "Ошибка: неполные данные. Попробуйте снова.",
+            reply_markup=_get_main_menu_button(),
+        )
+        return
+
+    datetimes = _recurring_datetimes(record, count)
+    appointments = [
+        {
+            "service_id": record.service_id,
+            "staff_id": record.staff_id,
+            "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for dt in datetimes
+    ]
+    try:
+        results = await yclients.create_bookings(
+            record.client_name, record.client_phone, "", appointments
+        )
+    except (YClientsNotConfigured, YClientsUnavailable):
+        await callback.message.edit_text(UNAVAILABLE_MSG, reply_markup=_get_main_menu_button())
+        return
+    except Exception as e:
+        logging.exception("YClients create_bookings error: %s", e)
+        await callback.message.edit_text(
+            "Не удалось создать записи. Попробуйте позже или свяжитесь с администратором.",
+            reply_markup=_get_main_menu_button(),
+        )
+        return
+
+    lines = []
+    for dt, (success, msg, _) in zip(datetimes, results):
+        if success:
+            lines.append(f"✅ {dt:%d.%m.%Y %H:%M}")
+        else:
+            lines.append(f"❌ {dt:%d.%m.%Y %H:%M} — {msg}")
+    booked = sum(1 for success, _, _ in results if success)
+    await callback.message.edit_text(
+        f"Создано записей: {booked} из {len(results)}\n\n" + "\n".join(lines),
+        reply_markup=_get_main_menu_button(),
+    )
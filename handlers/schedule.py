@@ -1,18 +1,17 @@
 """Schedule handler - shows available classes from YClients."""
+import asyncio
+import logging
 from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from services.yclients import YClientsNotConfigured, YClientsService
-from config import YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, YCLIENTS_COMPANY_ID
+from services.yclients import YClientsNotConfigured, YClientsUnavailable, get_yclients
 from data.studio_info import STUDIO, TRAINERS, TRAINERS_INFO
 
 router = Router(name="schedule")
 
-yclients = YClientsService(
-    YCLIENTS_TOKEN, YCLIENTS_USER_TOKEN, str(YCLIENTS_COMPANY_ID)
-)
+yclients = get_yclients()
 
 UNAVAILABLE_MSG = f"Онлайн-запись временно недоступна. Позвоните нам: {STUDIO['phone']}"
 
@@ -24,23 +23,27 @@ async def show_schedule(callback: CallbackQuery):
     msg = await callback.message.answer("⏳ Загружаю расписание...")
 
     try:
-        services = await yclients.get_services()
-        staff = await yclients.get_staff()
-        for s in staff:
-            name = s.get("name", "")
-            info = TRAINERS_INFO.get(name, {})
-            s["best_for"] = info.get("best_for", "")
-            s["experience"] = info.get("experience", "")
+        services, raw_staff = await asyncio.gather(
+            yclients.get_services(), yclients.get_staff()
+        )
+        # Копии: get_staff() отдаёт объекты из общего кэша каталога
+        staff = []
+        for s in raw_staff:
+            info = TRAINERS_INFO.get(s.get("name", ""), {})
+            staff.append({
+                **s,
+                "best_for": info.get("best_for", ""),
+                "experience": info.get("experience", ""),
+            })
+        slots = []
+        if staff and services:
+            # Все тренеры параллельно, по запросу на тренера: одна задержка API, а не N
+            slots = await yclients.get_next_free_slots(staff, services)
         if not staff:
             staff = [{"id": i + 1, "name": name} for i, name in enumerate(TRAINERS)]
-        dates = []
-        if staff and services:
-            first_staff_id = staff[0].get("id")
-            first_svc_id = services[0].get("id")
-            if first_staff_id is not None and first_svc_id is not None:
-                dates = await yclients.get_available_dates(first_staff_id, first_svc_id)
+        nearest = {slot["staff_id"]: slot["date"] for slot in slots if slot["date"]}
 
-        if not dates and not services:
+        if not nearest and not services:
             text = (
                 "К сожалению, в данный момент нет доступных занятий для записи.\n\n"
                 "Пожалуйста, свяжитесь с нами для уточнения расписания."
@@ -53,6 +56,13 @@ async def show_schedule(callback: CallbackQuery):
                     name = s.get("name", "Инструктор")
                     desc = s.get("best_for") or s.get("experience") or ""
                     text += f"• *{name}*"
+                    date_str = nearest.get(s.get("id"))
+                    if date_str:
+                        try:
+                            dt = datetime.strptime(date_str, "%Y-%m-%d")
+                            text += f" — ближайшая дата: {dt.strftime('%d.%m.%Y')}"
+                        except (ValueError, TypeError):
+                            text += f" — ближайшая дата: {date_str}"
                     if desc:
                         text += f"\n  _{desc}_"
                     text += "\n"
@@ -70,14 +80,6 @@ async def show_schedule(callback: CallbackQuery):
                     if mins:
                         text += f" ({mins} мин)"
                     text += "\n"
-            if dates:
-                text += "\n*Ближайшие доступные даты:*\n"
-                for date_str in dates[:7]:
-                    try:
-                        dt = datetime.strptime(date_str, "%Y-%m-%d")
-                        text += f"• {dt.strftime('%d.%m.%Y')}\n"
-                    except (ValueError, TypeError):
-                        text += f"• {date_str}\n"
             text += "\nИспользуйте кнопку «Записаться», чтобы выбрать время."
 
         builder = InlineKeyboardBuilder()
@@ -86,11 +88,11 @@ async def show_schedule(callback: CallbackQuery):
         builder.adjust(1)
 
         await msg.edit_text(text, reply_markup=builder.as_markup(), parse_mode="Markdown")
-    except YClientsNotConfigured:
+    except (YClientsNotConfigured, YClientsUnavailable):
         await msg.edit_text(UNAVAILABLE_MSG)
     except Exception as e:
+        logging.exception("YClients schedule error: %s", e)
         await msg.edit_text(
-            f"Не удалось загрузить расписание.\n"
-            f"Ошибка: {str(e)}\n\n"
-            f"Попробуйте позже или свяжитесь с администратором."
+            "Не удалось загрузить расписание.\n\n"
+            "Попробуйте позже или свяжитесь с администратором."
         )
@@ -1,4 +1,16 @@
 """Services module."""
-from .yclients import YClientsNotConfigured, YClientsService
+from .yclients import (
+    Record,
+    YClientsNotConfigured,
+    YClientsService,
+    YClientsUnavailable,
+    get_yclients,
+)
 
-__all__ = ["YClientsService", "YClientsNotConfigured"]
+__all__ = [
+    "Record",
+    "YClientsService",
+    "YClientsNotConfigured",
+    "YClientsUnavailable",
+    "get_yclients",
+]
@@ -0,0 +1,342 @@
+"""
+Local YClients stand-in for load and latency testing.
+
+Run:  python -m services.fake_yclients --port 8081 --latency 0.05 --error-rate 0.01
+and point the bot at it with YCLIENTS_BASE_URL=http://127.0.0.1:8081/api/v1.
+Tests and benchmarks start it in-process with start_server().
+"""
+import argparse
+import asyncio
+import logging
+import random
+from datetime import date, datetime, timedelta
+
+from aiohttp import web
+
+from data.studio_info import PRICES, RULES, TRAINERS_INFO
+from services.yclients import STUDIO_TZ, normalize_phone
+
+# Рабочие часы фейковой студии и горизонт записи
+OPEN_HOUR = 10
+CLOSE_HOUR = 21
+BOOKING_DAYS = 14
+SEANCE_LENGTH = RULES.get("session_duration_min", 55) * 60
+
+
+class FakeYClients:
+    """In-memory студия: услуги, тренеры, клиенты и записи в формате YClients."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        records: int = 300,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.requests = 0
+
+        self.services = [
+            {
+                "id": 100 + i,
+                "title": item["name"],
+                "booking_title": item["name"],
+                "price_min": item["price"],
+                "price_max": item["price"],
+                "duration": item.get("duration", 55) * 60,
+                "active": 1,
+            }
+            for i, item in enumerate(
+                item for group in PRICES.values() for item in group
+            )
+        ]
+        self.staff = [
+            {
+                "id": 10 + i,
+                "name": name,
+                "specialization": info.get("specialization", ""),
+                "avatar": f"https://example.invalid/avatar/{10 + i}.jpg",
+                "bookable": True,
+            }
+            for i, (name, info) in enumerate(TRAINERS_INFO.items())
+        ]
+        self.clients: dict[str, dict] = {}  # phone -> client
+        self.records: dict[int, dict] = {}  # record id -> record
+        self._next_record_id = 1000
+        self._seed_records(records)
+
+    # --- data ---
+
+    def _client(self, phone: str, name: str = "", email: str = "") -> dict:
+        phone = normalize_phone(phone)
+        client = self.clients.get(phone)
+        if client is None:
+            client = {
+                "id": len(self.clients) + 1,
+                "name": name or f"Клиент {len(self.clients) + 1}",
+                "phone": phone.lstrip("+"),
+                "email": email,
+                "visits": 0,
+                "custom_fields": [
+                    {"title": "telegram_id", "value": str(100000 + len(self.clients))}
+                ],
+            }
+            self.clients[phone] = client
+        return client
+
+    def _slot_taken(self, staff_id: int, start: datetime) -> bool:
+        key = start.strftime("%Y-%m-%d %H:%M:%S")
+        return any(
+            r["staff_id"] == staff_id and r["date"] == key and not r["deleted"]
+            for r in self.records.values()
+        )
+
+    def _make_record(self, client: dict, staff: dict, service: dict, start: datetime, comment: str = "") -> dict:
+        self._next_record_id += 1
+        record = {
+            "id": self._next_record_id,
+            "company_id": 1,
+            "staff_id": staff["id"],
+            "services": [
+                {"id": service["id"], "title": service["title"], "cost": service["price_min"], "amount": 1}
+            ],
+            "staff": {"id": staff["id"], "name": staff["name"], "specialization": staff["specialization"]},
+            "client": client,
+            "date": start.strftime("%Y-%m-%d %H:%M:%S"),
+            "datetime": start.isoformat(),
+            "create_date": datetime.now(STUDIO_TZ).isoformat(),
+            "last_change_date": datetime.now(STUDIO_TZ).isoformat(),
+            "seance_length": SEANCE_LENGTH,
+            "length": SEANCE_LENGTH,
+            "comment": comment,
+            "attendance": 0,
+            "confirmed": 1,
+            "active": True,
+            "deleted": False,
+            "custom_fields": [],
+        }
+        self.records[record["id"]] = record
+        return record
+
+    def _seed_records(self, count: int) -> None:
+        today = date.today()
+        for _ in range(count):
+            staff = self._random.choice(self.staff)
+            start = STUDIO_TZ.localize(
+                datetime.combine(
+                    today + timedelta(days=self._random.randrange(-1, BOOKING_DAYS)),
+                    datetime.min.time(),
+                ).replace(hour=self._random.randrange(OPEN_HOUR, CLOSE_HOUR))
+            )
+            if self._slot_taken(staff["id"], start):
+                continue
+            phone = f"+7999{self._random.randrange(10**7):07d}"
+            self._make_record(self._client(phone), staff, self._random.choice(self.services), start)
+
+    def _free_slots(self, staff_id: int, day: date) -> list[datetime]:
+        slots = []
+        for hour in range(OPEN_HOUR, CLOSE_HOUR):
+            start = STUDIO_TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour))
+            if start > datetime.now(STUDIO_TZ) and not self._slot_taken(staff_id, start):
+                slots.append(start)
+        return slots
+
+    # --- HTTP ---
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        self.requests += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return web.json_response(
+                {"success": False, "meta": {"message": "Too many requests"}},
+                status=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            return web.json_response({"success": False, "meta": {"message": "Server error"}}, status=503)
+        return await handler(request)
+
+    @staticmethod
+    def _ok(data, status: int = 200) -> web.Response:
+        return web.json_response({"success": True, "data": data, "meta": []}, status=status)
+
+    @staticmethod
+    def _fail(message: str, status: int = 422) -> web.Response:
+        return web.json_response(
+            {"success": False, "data": None, "meta": {"message": message}}, status=status
+        )
+
+    def _find(self, items: list[dict], item_id) -> dict | None:
+        return next((x for x in items if str(x["id"]) == str(item_id)), None)
+
+    async def book_services(self, request: web.Request) -> web.Response:
+        return self._ok(self.services)
+
+    async def book_staff(self, request: web.Request) -> web.Response:
+        return self._ok(self.staff)
+
+    async def book_dates(self, request: web.Request) -> web.Response:
+        staff_id = int(request.query.get("staff_id", self.staff[0]["id"]))
+        today = date.today()
+        days = [today + timedelta(days=i) for i in range(BOOKING_DAYS)]
+        booking = [d.isoformat() for d in days if self._free_slots(staff_id, d)]
+        return self._ok({"booking_days": {}, "booking_dates": booking, "working_dates": [d.isoformat() for d in days]})
+
+    async def book_times(self, request: web.Request) -> web.Response:
+        staff_id = int(request.match_info["staff_id"])
+        day = date.fromisoformat(request.match_info["date"])
+        return self._ok([
+            {"time": s.strftime("%H:%M"), "seance_length": SEANCE_LENGTH, "sum_length": SEANCE_LENGTH, "datetime": s.isoformat()}
+            for s in self._free_slots(staff_id, day)
+        ])
+
+    async def book_record(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        appointments = body.get("appointments") or []
+        planned = []
+        for app in appointments:
+            staff = self._find(self.staff, app.get("staff_id"))
+            service = self._find(self.services, (app.get("services") or [None])[0])
+            try:
+                start = datetime.fromisoformat(app.get("datetime", ""))
+            except ValueError:
+                return self._fail(f"Некорректная дата в записи {app.get('id')}")
+            start = STUDIO_TZ.localize(start) if start.tzinfo is None else start.astimezone(STUDIO_TZ)
+            if staff is None or service is None:
+                return self._fail(f"Неизвестная услуга или сотрудник в записи {app.get('id')}")
+            if self._slot_taken(staff["id"], start):
+                return self._fail(f"Время {start:%d.%m %H:%M} уже занято")
+            planned.append((app.get("id"), staff, service, start, app.get("comment", "")))
+        client = self._client(body.get("phone", ""), body.get("fullname", ""), body.get("email", ""))
+        created = []
+        for app_id, staff, service, start, comment in planned:
+            record = self._make_record(client, staff, service, start, comment)
+            created.append({"id": app_id, "record_id": record["id"], "record_hash": f"h{record['id']}"})
+        return self._ok(created, status=201)
+
+    async def records_list(self, request: web.Request) -> web.Response:
+        q = request.query
+        start = q.get("start_date", "0000-00-00")
+        end = q.get("end_date", "9999-99-99") + " 23:59:59"
+        phone = normalize_phone(q["phone"]) if q.get("phone") else None
+        changed_after = q.get("changed_after")
+        changed_after = datetime.fromisoformat(changed_after) if changed_after else None
+        items = sorted(
+            (
+                r for r in self.records.values()
+                if not r["deleted"]
+                and start <= r["date"] <= end
+                and (phone is None or normalize_phone(r["client"]["phone"]) == phone)
+                and (changed_after is None or datetime.fromisoformat(r["last_change_date"]) > changed_after)
+            ),
+            key=lambda r: r["date"],
+        )
+        count = int(q.get("count", 25))
+        page = int(q.get("page", 1))
+        return self._ok(items[(page - 1) * count:page * count])
+
+    async def record_delete(self, request: web.Request) -> web.Response:
+        record = self.records.get(int(request.match_info["record_id"]))
+        if record is None or record["deleted"]:
+            return self._fail("Запись не найдена", status=404)
+        record["deleted"] = True
+        record["last_change_date"] = datetime.now(STUDIO_TZ).isoformat()
+        return web.Response(status=204)
+
+    async def record_update(self, request: web.Request) -> web.Response:
+        record = self.records.get(int(request.match_info["record_id"]))
+        if record is None or record["deleted"]:
+            return self._fail("Запись не найдена", status=404)
+        app = ((await request.json()).get("appointments") or [{}])[0]
+        start = STUDIO_TZ.localize(datetime.fromisoformat(app.get("datetime", record["date"])))
+        staff = self._find(self.staff, app.get("staff_id", record["staff_id"]))
+        if staff is None:
+            return self._fail("Неизвестный сотрудник")
+        if self._slot_taken(staff["id"], start):
+            return self._fail(f"Время {start:%d.%m %H:%M} уже занято")
+        record.update(
+            staff_id=staff["id"],
+            staff={"id": staff["id"], "name": staff["name"], "specialization": staff["specialization"]},
+            date=start.strftime("%Y-%m-%d %H:%M:%S"),
+            datetime=start.isoformat(),
+            last_change_date=datetime.now(STUDIO_TZ).isoformat(),
+        )
+        return self._ok(record)
+
+    async def clients_search(self, request: web.Request) -> web.Response:
+        phone = request.query.get("phone")
+        if not phone:
+            return self._ok(list(self.clients.values())[:50])
+        client = self.clients.get(normalize_phone(phone))
+        return self._ok([client] if client else [])
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        prefix = "/api/v1"
+        app.router.add_get(prefix + "/book_services/{company_id}", self.book_services)
+        app.router.add_get(prefix + "/book_staff/{company_id}", self.book_staff)
+        app.router.add_get(prefix + "/book_dates/{company_id}", self.book_dates)
+        app.router.add_get(prefix + "/book_times/{company_id}/{staff_id}/{date}", self.book_times)
+        app.router.add_post(prefix + "/book_record/{company_id}", self.book_record)
+        app.router.add_get(prefix + "/records/{company_id}", self.records_list)
+        app.router.add_delete(prefix + "/records/{company_id}/{record_id}", self.record_delete)
+        app.router.add_put(prefix + "/records/{company_id}/{record_id}", self.record_update)
+        app.router.add_get(prefix + "/clients/{company_id}", self.clients_search)
+        return app
+
+
+async def start_server(
+    fake: FakeYClients, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """
+    Запустить fake в текущем event loop (port=0 — любой свободный).
+    Возвращает (runner, base_url); остановка — await runner.cleanup().
+    """
+    runner = web.AppRunner(fake.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/api/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake YClients API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="базовая задержка, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After для 429, с")
+    parser.add_argument("--records", type=int, default=300, help="сколько записей сгенерировать")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fake = FakeYClients(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        records=args.records,
+        seed=args.seed,
+    )
+    web.run_app(fake.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
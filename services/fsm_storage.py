@@ -0,0 +1,230 @@
+"""FSM storage для aiogram на SQLite: переживает рестарт, память ограничена."""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from services.metrics import METRICS
+
+FSM_STORE_FILE = Path("data/fsm.sqlite3")
+# Горячий кэш: столько пользователей держим в памяти
+CACHE_SIZE = 10000
+# Изменения пишутся на диск пачкой не реже чем раз в FLUSH_INTERVAL секунд
+FLUSH_INTERVAL = 1.0
+# Состояние и данные пользователя, не менявшиеся TTL секунд, удаляются
+TTL = 30 * 24 * 3600
+PURGE_INTERVAL = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fsm_updated ON fsm(updated_at);
+"""
+
+
+class _Entry:
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(self, state: Optional[str], data: dict, updated_at: float):
+        self.state = state
+        self.data = data  # не меняется на месте: set_data кладёт новую копию
+        self.updated_at = updated_at
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Состояния FSM в SQLite (WAL) с LRU-кэшем горячих пользователей и
+    отложенной записью: set_* меняют кэш, фоновая задача раз в
+    FLUSH_INTERVAL пишет изменённые ключи одной транзакцией в потоке.
+    Пустые состояние и данные удаляются из базы, простаивающие дольше TTL —
+    считаются пустыми и периодически вычищаются. Промахи кэша читаются
+    отдельным соединением: в WAL чтение не ждёт идущую запись.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = FSM_STORE_FILE,
+        cache_size: int = CACHE_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        ttl: float = TTL,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+        # Соединение записи (поток сброса, purge, close) под _lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        # Только чтение, только из event loop
+        self._reader = sqlite3.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._dirty: dict[str, _Entry] = {}
+        # Снятые с _dirty, но ещё не закоммиченные: читаются вместо базы
+        self._flushing: dict[str, _Entry] = {}
+        self._flusher: asyncio.Task | None = None
+        self._last_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+        METRICS.register_collector(self.collect_metrics)
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name = self.key_builder.build(key)
+        state = state.state if isinstance(state, State) else state
+        self._write(name, state, self._entry(name).data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._entry(self.key_builder.build(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        name = self.key_builder.build(key)
+        self._write(name, self._entry(name).state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._entry(self.key_builder.build(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        # Пачка прерванной задачи могла не дойти до базы — пишем её вместе с новыми
+        self._take_dirty()
+        self._flush(self._flushing)
+        self._flushing = {}
+        self._reader.close()
+        with self._lock:
+            self._db.close()
+
+    # --- cache ---
+
+    def _entry(self, name: str) -> _Entry:
+        entry = self._cache.get(name)
+        if entry is not None:
+            self._cache.move_to_end(name)
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = self._dirty.get(name) or self._flushing.get(name) or self._load(name)
+            self._remember(name, entry)
+        if entry.updated_at and time.time() - entry.updated_at > self.ttl:
+            entry = _Entry(None, {}, 0.0)
+            self._cache[name] = entry
+        return entry
+
+    def _load(self, name: str) -> _Entry:
+        row = self._reader.execute(
+            "SELECT state, data, updated_at FROM fsm WHERE key = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return _Entry(None, {}, 0.0)
+        return _Entry(row[0], json.loads(row[1]), row[2])
+
+    def _remember(self, name: str, entry: _Entry) -> None:
+        self._cache[name] = entry
+        # Вытеснение безопасно: несохранённые записи остаются в _dirty до сброса
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _write(self, name: str, state: Optional[str], data: dict) -> None:
+        entry = _Entry(state, data, time.time())
+        self._remember(name, entry)
+        self._cache.move_to_end(name)
+        self._dirty[name] = entry
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    # --- write-behind ---
+
+    def _take_dirty(self) -> dict[str, _Entry]:
+        dirty, self._dirty = self._dirty, {}
+        self._flushing.update(dirty)
+        return dirty
+
+    def _flush(self, dirty: dict[str, _Entry]) -> None:
+        """Записать снимок изменений одной транзакцией (блокирующе)."""
+        upserts, deletes = [], []
+        for name, entry in dirty.items():
+            if entry.state is None and not entry.data:
+                # Пустое состояние без данных хранить незачем
+                deletes.append((name,))
+            else:
+                data = json.dumps(entry.data, ensure_ascii=False, default=str)
+                upserts.append((name, entry.state, data, entry.updated_at))
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                upserts,
+            )
+            self._db.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+
+    def _flushed(self, dirty: dict[str, _Entry], ok: bool) -> None:
+        for name, entry in dirty.items():
+            if self._flushing.get(name) is entry:
+                del self._flushing[name]
+            # Неудачная пачка вернётся в следующую, если ключ не успели изменить
+            if not ok and name not in self._dirty:
+                self._dirty[name] = entry
+
+    def purge(self, now: float | None = None) -> int:
+        """Удалить из базы пользователей, простаивающих дольше TTL."""
+        now = time.time() if now is None else now
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM fsm WHERE updated_at < ?", (now - self.ttl,))
+        self._last_purge = now
+        return cur.rowcount
+
+    async def _flush_loop(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            dirty = self._take_dirty()
+            ok = True
+            try:
+                await asyncio.to_thread(self._flush, dirty)
+                if time.time() - self._last_purge > PURGE_INTERVAL:
+                    await asyncio.to_thread(self.purge)
+            except Exception as e:
+                ok = False
+                logging.warning(f"FSM storage: запись не удалась — {e}")
+            self._flushed(dirty, ok)
+
+    # --- stats ---
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def collect_metrics(self, metrics) -> None:
+        stats = self.stats()
+        metrics.gauge_set("fsm_cache_entries", stats["cached"], help="Пользователи в кэше FSM")
+        metrics.gauge_set("fsm_dirty_entries", stats["dirty"], help="Несохранённые изменения FSM")
+        metrics.gauge_set("fsm_cache_hit_ratio", stats["hit_rate"], help="Доля попаданий в кэш FSM")
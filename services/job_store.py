@@ -0,0 +1,134 @@
+"""APScheduler job store on stdlib sqlite3 (без SQLAlchemy)."""
+import logging
+import pickle
+import sqlite3
+from pathlib import Path
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+JOB_STORE_FILE = Path("data/scheduler.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_next_run_time ON apscheduler_jobs(next_run_time);
+"""
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    Задания планировщика в SQLite: next_run_time переживает рестарт, и
+    пропущенные за время простоя запуски обрабатываются по misfire_grace_time.
+    Функции заданий должны быть доступны по текстовой ссылке, args — picklable.
+    """
+
+    def __init__(self, path: Path | str = JOB_STORE_FILE, pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = Path(path)
+        self.pickle_protocol = pickle_protocol
+        self._db: sqlite3.Connection | None = None
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def shutdown(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def lookup_job(self, job_id):
+        row = self._db.execute(
+            "SELECT job_state FROM apscheduler_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs(
+            "WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),)
+        )
+
+    def get_next_run_time(self):
+        row = self._db.execute(
+            "SELECT next_run_time FROM apscheduler_jobs"
+            " WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1"
+        ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO apscheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                    (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job)),
+                )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with self._db:
+            cur = self._db.execute(
+                "UPDATE apscheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id),
+            )
+        if cur.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self._db:
+            cur = self._db.execute("DELETE FROM apscheduler_jobs WHERE id = ?", (job_id,))
+        if cur.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self._db:
+            self._db.execute("DELETE FROM apscheduler_jobs")
+
+    def _dump(self, job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: tuple = ()):
+        jobs = []
+        failed_job_ids = []
+        rows = self._db.execute(
+            f"SELECT id, job_state FROM apscheduler_jobs {where} ORDER BY next_run_time",
+            params,
+        ).fetchall()
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except BaseException:
+                logging.exception(f"Scheduler: не удалось восстановить задание {job_id}, удаляю")
+                failed_job_ids.append(job_id)
+        # Задания, которые уже не восстановить (например, функцию переименовали)
+        if failed_job_ids:
+            with self._db:
+                self._db.executemany(
+                    "DELETE FROM apscheduler_jobs WHERE id = ?", [(i,) for i in failed_job_ids]
+                )
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.path})>"
@@ -0,0 +1,178 @@
+"""Метрики процесса в формате Prometheus (text exposition 0.0.4)."""
+import logging
+import re
+from bisect import bisect_left
+
+from aiohttp import web
+
+__all__ = ["METRICS", "Metrics", "path_template", "start_metrics_server"]
+
+# Границы корзин гистограмм: задержка в секундах и размер ответа в байтах
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_NUMERIC = re.compile(r"^\d+$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_BACKSLASH = "\\"
+_QUOTE = '"'
+
+
+def path_template(path: str) -> str:
+    """
+    Шаблон пути для меток: /book_times/123/45/2024-01-31 →
+    /book_times/{company_id}/{id}/{date}. Иначе каждая дата — отдельный ряд.
+    """
+    out = []
+    numeric_seen = False
+    for segment in path.split("/"):
+        if _DATE.match(segment):
+            segment = "{date}"
+        elif _NUMERIC.match(segment):
+            segment = "{id}" if numeric_seen else "{company_id}"
+            numeric_seen = True
+        out.append(segment)
+    return "/".join(out)
+
+
+def _labels_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="{str(v).replace(_BACKSLASH, _BACKSLASH * 2).replace(_QUOTE, _BACKSLASH + _QUOTE)}"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля по верхней границе корзины (для логов и /stats)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Счётчики, gauge и гистограммы с метками. Метки передаются как kwargs;
+    тип и описание метрики фиксируются при первом обращении.
+    """
+
+    def __init__(self):
+        self._meta: dict[str, tuple[str, str]] = {}  # name -> (type, help)
+        self._values: dict[str, dict[tuple, object]] = {}
+        self._collectors = []
+
+    def _series(self, name: str, kind: str, help_text: str) -> dict:
+        if name not in self._meta:
+            self._meta[name] = (kind, help_text)
+            self._values[name] = {}
+        return self._values[name]
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels) -> None:
+        series = self._series(name, "counter", help)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def gauge_add(self, name: str, value: float, help: str = "", **labels) -> None:
+        series = self._series(name, "gauge", help)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def gauge_set(self, name: str, value: float, help: str = "", **labels) -> None:
+        self._series(name, "gauge", help)[tuple(sorted(labels.items()))] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple = LATENCY_BUCKETS,
+        help: str = "",
+        **labels,
+    ) -> None:
+        series = self._series(name, "histogram", help)
+        key = tuple(sorted(labels.items()))
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(buckets)
+        hist.observe(value)
+
+    def histogram(self, name: str, **labels) -> _Histogram | None:
+        return self._values.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def register_collector(self, collect) -> None:
+        """collect() вызывается перед каждым экспортом, чтобы обновить gauge."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect(self)
+            except Exception as e:
+                logging.warning(f"Metrics collector {collect!r}: {e}")
+        lines = []
+        for name, (kind, help_text) in self._meta.items():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in self._values[name].items():
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels_text(key)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(value.buckets + (float("inf"),), value.counts):
+                    cumulative += n
+                    labels = _labels_text(key + (("le", _number(bound)),))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_sum{_labels_text(key)} {_number(value.sum)}")
+                lines.append(f"{name}_count{_labels_text(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр процесса
+METRICS = Metrics()
+
+
+async def start_metrics_server(
+    host: str, port: int, metrics: Metrics = METRICS
+) -> web.AppRunner:
+    """Поднять GET /metrics на host:port. Остановка — await runner.cleanup()."""
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics: http://{host}:{port}/metrics")
+    return runner
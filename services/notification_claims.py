@@ -0,0 +1,155 @@
+"""
+Межпроцессная дедупликация уведомлений: перед отправкой реплика атомарно
+захватывает (record, event) в общей SQLite-базе (WAL). Захват умершей
+реплики считается протухшим через CLAIM_TTL и может быть перехвачен.
+
+Только для реплик на одном хосте: блокировки SQLite и shared memory WAL
+не работают между машинами и на сетевых ФС (NFS, SMB и т.п.) — захваты
+там молча перестают быть атомарными. Поэтому файл на сетевой ФС
+ClaimStore открывать отказывается.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+CLAIMS_FILE = Path("data/notified.sqlite3")
+# Сколько секунд захват без подтверждения считается живым
+CLAIM_TTL = 300
+# Типы ФС из /proc/mounts, на которых SQLite WAL небезопасен
+NETWORK_FILESYSTEMS = frozenset({
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "9p",
+    "ceph", "glusterfs", "lustre", "gpfs",
+    "fuse.glusterfs", "fuse.cephfs", "fuse.sshfs", "fuse.s3fs", "fuse.rclone",
+})
+MOUNTS_FILE = "/proc/mounts"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_claims_expires ON claims(expires_at);
+"""
+
+# Новый захват, либо перехват протухшего/истёкшего; отправленные не трогаем
+_CLAIM_SQL = """
+INSERT INTO claims (key, owner, sent, claimed_at, expires_at) VALUES (?, ?, 0, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    owner = excluded.owner,
+    sent = 0,
+    claimed_at = excluded.claimed_at,
+    expires_at = excluded.expires_at
+WHERE (claims.sent = 0 AND claims.claimed_at < ?) OR claims.expires_at < ?
+"""
+
+def _filesystem_type(path: Path) -> str | None:
+    """Тип ФС, на которой лежит path, по самой длинной точке монтирования; None вне Linux."""
+    try:
+        with open(MOUNTS_FILE, encoding="utf-8") as f:
+            mounts = f.read().splitlines()
+    except OSError:
+        return None
+    target = os.path.realpath(path)
+    best, fstype = "", None
+    for line in mounts:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        # Пробелы в путях /proc/mounts экранирует как \040
+        mount = fields[1].replace("\\040", " ")
+        prefix = mount.rstrip("/") + "/"
+        if (target == mount or target.startswith(prefix)) and len(mount) >= len(best):
+            best, fstype = mount, fields[2]
+    return fstype
+
+
+CLAIMED = "claimed"
+SENT = "sent"
+BUSY = "busy"
+
+
+class ClaimStore:
+    """
+    claim() → CLAIMED (можно отправлять), SENT (уже отправлено кем-то)
+    или BUSY (сейчас отправляет другая реплика). После отправки — confirm(),
+    при ошибке — release(), чтобы событие можно было повторить.
+    Методы блокирующие: из event loop вызывать через asyncio.to_thread.
+    Файл — на локальном диске хоста, общем для его реплик.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = CLAIMS_FILE,
+        owner: str | None = None,
+        claim_ttl: float = CLAIM_TTL,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fstype = _filesystem_type(self.path.parent)
+        if fstype in NETWORK_FILESYSTEMS:
+            raise RuntimeError(
+                f"notification_claims: {self.path} на сетевой ФС ({fstype}) — "
+                f"SQLite WAL работает только для реплик одного хоста на локальном диске"
+            )
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.claim_ttl = claim_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.path), check_same_thread=False, timeout=10, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def claim(self, key: str, expires_at: float) -> str:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._db.execute(
+                    _CLAIM_SQL, (key, self.owner, now, expires_at, now - self.claim_ttl, now)
+                )
+                if cur.rowcount == 1:
+                    status = CLAIMED
+                else:
+                    (sent,) = self._db.execute(
+                        "SELECT sent FROM claims WHERE key = ?", (key,)
+                    ).fetchone()
+                    status = SENT if sent else BUSY
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return status
+
+    def confirm(self, key: str) -> bool:
+        """Отметить отправку; False, если захват успели перехватить как протухший."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE claims SET sent = 1 WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+        return cur.rowcount == 1
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM claims WHERE key = ? AND owner = ? AND sent = 0", (key, self.owner)
+            )
+
+    def prune(self, now: float | None = None) -> int:
+        """Удалить истёкшие записи (по индексу expires_at)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cur = self._db.execute("DELETE FROM claims WHERE expires_at < ?", (now,))
+        return cur.rowcount
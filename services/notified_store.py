@@ -1,36 +1,463 @@
+"""
+Какие уведомления уже отправлены: снимок data/notified.json плюс
+append-only журнал data/notified.log (строка "record_id:event expires_at" на отметку).
+Журнал периодически сворачивается в снимок в фоне.
+
+Отметка живёт до времени записи + MARKER_TTL: позже ни одно правило её
+уже не отправит. Истёкшие отметки удаляются по часовым корзинам.
+
+В event loop используйте amark_notified: строки журнала копятся и пишутся
+пачками в потоке (group commit) фоновой задачей start_writer().
+
+Файлы читаются при первом обращении, журнал открывается при первой отметке
+(или в start_writer); set_path() до этого меняет их расположение.
+"""
+import asyncio
+import heapq
 import json
 import logging
+import os
+import time
+from datetime import datetime
 from pathlib import Path
 
+from services.metrics import METRICS
+
 STORE_FILE = Path("data/notified.json")
-_store: dict = {}
+LOG_FILE = STORE_FILE.with_suffix(".log")
+# Журнал, уже попавший в сворачиваемый снимок; удаляется после записи снимка
+ROTATED_LOG_FILE = STORE_FILE.with_suffix(".log.1")
+# Свернуть журнал, когда в нём столько строк
+COMPACT_EVERY = 10000
+# Срок жизни отметки после времени записи и без него (старые данные), секунды
+MARKER_TTL = 2 * 24 * 3600
+DEFAULT_TTL = 7 * 24 * 3600
+# Ширина корзины истечения, секунды
+BUCKET_SECONDS = 3600
+# Долговечность записи: "batch" — fsync каждой пачки до подтверждения,
+# "interval" — подтверждение после write, fsync не реже FSYNC_INTERVAL секунд
+DURABILITY_MODES = ("batch", "interval")
+FSYNC_INTERVAL = 1.0
+
+_loaded = False
+_store: dict[str, float] = {}  # key -> expires_at (time.time())
+_buckets: dict[int, list[str]] = {}  # номер корзины -> ключи, истекающие в ней
+_bucket_heap: list[int] = []
+_log = None
+_log_lines = 0
+_compacting = False
+_next_prune = 0.0
+_writer = None  # _Writer, пока запущен start_writer()
+_writer_config = ("batch", FSYNC_INTERVAL)  # режим для перезапуска writer
+
+
+def _put(key: str, expires_at: float) -> None:
+    _store[key] = expires_at
+    bucket = int(expires_at // BUCKET_SECONDS)
+    keys = _buckets.get(bucket)
+    if keys is None:
+        keys = _buckets[bucket] = []
+        heapq.heappush(_bucket_heap, bucket)
+    keys.append(key)
+
+
+def prune(now: float | None = None) -> int:
+    """Удалить истёкшие отметки. Просматриваются только корзины, чьё время прошло."""
+    global _next_prune
+    now = time.time() if now is None else now
+    removed = 0
+    current = int(now // BUCKET_SECONDS)
+    while _bucket_heap and _bucket_heap[0] < current:
+        for key in _buckets.pop(heapq.heappop(_bucket_heap)):
+            expires_at = _store.get(key)
+            # Ключ мог быть отмечен заново с более поздним сроком — тогда он в другой корзине
+            if expires_at is not None and expires_at <= now:
+                del _store[key]
+                removed += 1
+    _next_prune = (current + 1) * BUCKET_SECONDS
+    METRICS.inc("notified_markers_pruned_total", removed, help="Удалено истёкших отметок")
+    return removed
+
+
+def _replay(path: Path, now: float) -> int:
+    """Применить журнал к _store. Оборванная последняя строка (сбой при записи) пропускается."""
+    if not path.exists():
+        return 0
+    count = 0
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                logging.warning(f"notified_store: пропущена оборванная строка в {path}")
+                break
+            key, _, expires = line.strip().partition(" ")
+            if not key:
+                continue
+            count += 1
+            expires_at = float(expires) if expires else now + DEFAULT_TTL
+            if expires_at > now:
+                _put(key, expires_at)
+    return count
+
+
+def set_path(store_file: Path | str) -> None:
+    """Снимок в store_file, журналы рядом с ним. Только до первого обращения."""
+    global STORE_FILE, LOG_FILE, ROTATED_LOG_FILE
+    if _loaded:
+        raise RuntimeError("notified_store: хранилище уже открыто")
+    STORE_FILE = Path(store_file)
+    LOG_FILE = STORE_FILE.with_suffix(".log")
+    ROTATED_LOG_FILE = STORE_FILE.with_suffix(".log.1")
+
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        _load()
+
+
+def _ensure_log() -> None:
+    _ensure_loaded()
+    if _log is None:
+        _open_log()
 
 
 def _load():
-    global _store
+    global _store, _buckets, _bucket_heap, _log_lines
+    _store, _buckets, _bucket_heap = {}, {}, []
+    now = time.time()
     if STORE_FILE.exists():
         try:
-            _store = json.loads(STORE_FILE.read_text(encoding="utf-8"))
+            snapshot = json.loads(STORE_FILE.read_text(encoding="utf-8"))
         except Exception:
-            _store = {}
+            snapshot = {}
+        for key, expires_at in snapshot.items():
+            # Старый формат: {key: true} — без срока, даём DEFAULT_TTL
+            if expires_at is True:
+                expires_at = now + DEFAULT_TTL
+            if expires_at > now:
+                _put(key, expires_at)
+    # Прерванное сворачивание: старый журнал ещё не вошёл в снимок
+    _replay(ROTATED_LOG_FILE, now)
+    _log_lines = _replay(LOG_FILE, now)
+    prune(now)
+
+
+def _open_log():
+    global _log
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if LOG_FILE.exists() and LOG_FILE.stat().st_size:
+        # Обрезать оборванную строку, чтобы следующая отметка к ней не приклеилась
+        with LOG_FILE.open("r+b") as f:
+            data = f.read()
+            if not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    _log = LOG_FILE.open("a", encoding="utf-8")
 
 
-def _save():
-    import shutil
-    import tempfile
+def _write_snapshot(snapshot: dict):
+    """Атомарно заменить снимок (tmp + fsync + replace), затем удалить свёрнутый журнал."""
     STORE_FILE.parent.mkdir(parents=True, exist_ok=True)
     tmp = STORE_FILE.with_suffix(".tmp")
-    tmp.write_text(json.dumps(_store), encoding="utf-8")
-    shutil.move(str(tmp), str(STORE_FILE))
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, STORE_FILE)
+    ROTATED_LOG_FILE.unlink(missing_ok=True)
+
+
+def _rotate_log() -> dict:
+    """Переименовать журнал (новые отметки идут в свежий); копия словаря для снимка."""
+    global _log_lines
+    if _log is not None:
+        _log.close()
+    if LOG_FILE.exists():
+        if ROTATED_LOG_FILE.exists():
+            # Предыдущее сворачивание не завершилось: допишем его журнал в новый снимок
+            with ROTATED_LOG_FILE.open("a", encoding="utf-8") as f:
+                f.write(LOG_FILE.read_text(encoding="utf-8"))
+            LOG_FILE.unlink()
+        else:
+            os.replace(LOG_FILE, ROTATED_LOG_FILE)
+    _open_log()
+    _log_lines = 0
+    return dict(_store)
+
+
+def compact(background: bool = True):
+    """
+    Свернуть журнал в снимок (только живые отметки). Журнал переименовывается,
+    копия словаря пишется в снимок — в потоке, если есть event loop.
+    """
+    global _compacting
+    if _compacting:
+        return
+    _ensure_log()
+    prune()
+    snapshot = _rotate_log()
+
+    try:
+        loop = asyncio.get_running_loop() if background else None
+    except RuntimeError:
+        loop = None
+    if loop is None:
+        _write_snapshot(snapshot)
+        return
+
+    def done(future):
+        global _compacting
+        _compacting = False
+        if future.exception() is not None:
+            logging.warning(f"notified_store: сворачивание журнала не удалось — {future.exception()}")
+
+    _compacting = True
+    loop.run_in_executor(None, _write_snapshot, snapshot).add_done_callback(done)
+
+
+def collect_metrics(metrics) -> None:
+    _ensure_loaded()
+    metrics.gauge_set(
+        "notified_markers", len(_store), help="Живые отметки об отправленных уведомлениях"
+    )
+    size = sum(p.stat().st_size for p in (STORE_FILE, LOG_FILE, ROTATED_LOG_FILE) if p.exists())
+    metrics.gauge_set(
+        "notified_store_bytes", size, help="Размер снимка и журналов notified_store"
+    )
+
 
+def _compact_safely() -> None:
+    """compact(), не роняющий запись: при ошибке повторим через COMPACT_EVERY строк."""
+    global _log_lines
+    try:
+        compact()
+    except Exception as e:
+        _log_lines = 0
+        logging.warning(f"notified_store: сворачивание журнала не удалось — {e}")
 
-_load()
+
+async def _acompact_safely() -> None:
+    """
+    Сворачивание для writer: переименование журнала, копия словаря и снимок —
+    в потоке. Writer ждёт его, так что журнал в это время никто не пишет.
+    """
+    global _log_lines, _compacting
+    if _compacting:
+        return
+    _compacting = True
+    try:
+        prune()
+        await asyncio.to_thread(lambda: _write_snapshot(_rotate_log()))
+    except Exception as e:
+        _log_lines = 0
+        logging.warning(f"notified_store: сворачивание журнала не удалось — {e}")
+    finally:
+        _compacting = False
+
+
+def _append_batch(lines: list[str], sync: bool) -> None:
+    if _log is None or _log.closed:
+        _open_log()  # сворачивание могло не переоткрыть журнал
+    _log.write("".join(lines))
+    _log.flush()
+    if sync:
+        os.fsync(_log.fileno())
+
+
+class _Writer:
+    """
+    Фоновая задача записи журнала. Собирает все накопившиеся строки в одну
+    пачку, пишет её в потоке и подтверждает ожидающим разом (group commit).
+    Если задача всё же упала, очередь дописывается синхронно, а следующая
+    amark_notified запускает новый writer.
+    """
+
+    def __init__(self, durability: str, fsync_interval: float):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"notified_store: неизвестный режим {durability!r}")
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        self.batches = 0
+
+    def put(self, line: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((line, future))
+        return future
+
+    async def _run(self) -> None:
+        try:
+            await self._loop()
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            logging.exception(f"notified_store: writer остановился — {e!r}")
+            self._drain_sync()
+            _writer_died(self)
+
+    def _drain_sync(self) -> None:
+        """Дописать оставшиеся в очереди строки синхронно и разбудить ожидающих."""
+        items = []
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        error = None
+        try:
+            if items:
+                _append_batch([line for line, _ in items], True)
+        except Exception as e:
+            error = e
+            logging.warning(f"notified_store: запись журнала не удалась — {e}")
+        for _, future in items:
+            if not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+            self._queue.task_done()
+
+    async def _loop(self) -> None:
+        global _log_lines
+        while True:
+            timeout = self.fsync_interval if self._dirty else None
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush([], [])  # хвост для режима "interval"
+                continue
+            items = [item]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                await self._flush([line for line, _ in items], [f for _, f in items])
+                _log_lines += len(items)
+                if _log_lines >= COMPACT_EVERY:
+                    await _acompact_safely()
+            except BaseException as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    async def _flush(self, lines: list[str], futures: list) -> None:
+        now = time.monotonic()
+        sync = self.durability == "batch" or (
+            (self._dirty or bool(lines)) and now - self._last_fsync >= self.fsync_interval
+        )
+        try:
+            if lines or sync:
+                await asyncio.to_thread(_append_batch, lines, sync)
+        except Exception as e:
+            logging.warning(f"notified_store: запись журнала не удалась — {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if sync:
+            self._last_fsync = now
+        self._dirty = bool(lines) and not sync
+        self.batches += bool(lines)
+        for future in futures:
+            if not future.done():
+                future.set_result(None)
+
+    async def close(self) -> None:
+        """Дописать очередь, сделать fsync и остановить задачу."""
+        if not self._task.done():
+            await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if self._dirty:
+            _append_batch([], True)
+
+
+def _writer_died(writer: _Writer) -> None:
+    global _writer
+    if _writer is writer:
+        _writer = None
+
+
+def start_writer(durability: str | None = None, fsync_interval: float | None = None) -> None:
+    """
+    Запустить фоновую запись журнала (нужен работающий event loop).
+    Без аргументов — с режимом прошлого запуска (по умолчанию "batch").
+    """
+    global _writer, _writer_config
+    if durability is not None or fsync_interval is not None:
+        _writer_config = (
+            durability or _writer_config[0],
+            _writer_config[1] if fsync_interval is None else fsync_interval,
+        )
+    if _writer is None:
+        _ensure_log()
+        _writer = _Writer(*_writer_config)
+
+
+async def close() -> None:
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        await writer.close()
+
+
+METRICS.register_collector(collect_metrics)
 
 
 def is_notified(record_id, event: str) -> bool:
-    return _store.get(f"{record_id}:{event}", False)
+    _ensure_loaded()
+    expires_at = _store.get(f"{record_id}:{event}")
+    return expires_at is not None and expires_at > time.time()
+
+
+def _mark(record_id, event: str, at: datetime | None) -> str | None:
+    """Отметить в памяти; строка журнала или None, если отметка уже есть."""
+    _ensure_log()
+    now = time.time()
+    key = f"{record_id}:{event}"
+    expires_at = at.timestamp() + MARKER_TTL if at is not None else now + DEFAULT_TTL
+    if _store.get(key, 0) >= expires_at:
+        return None
+    _put(key, expires_at)
+    if now >= _next_prune:
+        prune(now)
+    return f"{key} {expires_at:.0f}\n"
+
+
+def mark_notified(record_id, event: str, at: datetime | None = None):
+    """
+    Отметить отправку. at — время записи: отметка истекает через MARKER_TTL
+    после него (без at — через DEFAULT_TTL от текущего момента).
+    Синхронная запись; при запущенном writer строка уходит в его очередь.
+    """
+    global _log_lines
+    line = _mark(record_id, event, at)
+    if line is None:
+        return
+    if _writer is not None:
+        _writer.put(line)
+        return
+    # Строка целиком уходит в ОС до возврата: переживает падение процесса
+    _append_batch([line], False)
+    _log_lines += 1
+    if _log_lines >= COMPACT_EVERY:
+        _compact_safely()
 
 
-def mark_notified(record_id, event: str):
-    _store[f"{record_id}:{event}"] = True
-    _save()
+async def amark_notified(record_id, event: str, at: datetime | None = None):
+    """
+    mark_notified без блокирования event loop. В памяти отметка видна сразу,
+    возврат — когда строка записана согласно режиму долговечности writer.
+    """
+    line = _mark(record_id, event, at)
+    if line is None:
+        return
+    start_writer()
+    await _writer.put(line)
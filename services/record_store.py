@@ -0,0 +1,142 @@
+"""Local SQLite mirror of YClients records (full backfill + delta syncs)."""
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+STORE_FILE = Path("data/records.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    start TEXT NOT NULL,
+    client_phone TEXT,
+    telegram_id TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    payload TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_records_start ON records(start);
+CREATE INDEX IF NOT EXISTS ix_records_phone ON records(client_phone, start);
+CREATE INDEX IF NOT EXISTS ix_records_telegram ON records(telegram_id, start);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class RecordStore:
+    """
+    Локальная копия записей студии. Время начала хранится строкой
+    "YYYY-MM-DD HH:MM:SS" (время студии), поэтому диапазоны — сравнение строк.
+    """
+
+    def __init__(self, path: Path | str = STORE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    # --- sync bookkeeping ---
+
+    def get_meta(self, key: str) -> str | None:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, str(value)),
+            )
+
+    @property
+    def last_sync(self) -> float | None:
+        """time.time() последней успешной синхронизации."""
+        value = self.get_meta("last_sync")
+        return float(value) if value else None
+
+    def sync_lag(self) -> float | None:
+        """Секунд с последней синхронизации (None — ещё не было)."""
+        last = self.last_sync
+        return time.time() - last if last is not None else None
+
+    # --- writes ---
+
+    def upsert(self, rows: list[tuple]) -> None:
+        """rows: (id, start, client_phone, telegram_id, active, record_dict)."""
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records "
+                "(id, start, client_phone, telegram_id, active, payload, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (rid, start, phone, tg_id, int(active), json.dumps(record, ensure_ascii=False), now)
+                    for rid, start, phone, tg_id, active, record in rows
+                ],
+            )
+
+    def deactivate(self, record_ids) -> None:
+        with self._db:
+            self._db.executemany(
+                "UPDATE records SET active = 0 WHERE id = ?",
+                [(int(rid),) for rid in record_ids],
+            )
+
+    def remove_missing(self, start: str, end: str, seen_ids: set) -> list[int]:
+        """Удалить записи окна [start, end], которых больше нет в YClients; их id."""
+        missing = sorted(self.index_between(start, end).keys() - seen_ids)
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM records WHERE id = ?", [(rid,) for rid in missing]
+            )
+        return missing
+
+    # --- reads ---
+
+    def index_between(self, start: str, end: str) -> dict:
+        """{id: (start, active)} для всех записей окна, включая неактивные."""
+        rows = self._db.execute(
+            "SELECT id, start, active FROM records WHERE start >= ? AND start <= ?",
+            (start, end),
+        )
+        return {rid: (rstart, bool(active)) for rid, rstart, active in rows}
+
+    def _select(self, where: str, args: tuple) -> list[dict]:
+        rows = self._db.execute(
+            f"SELECT payload FROM records WHERE active = 1 AND {where} ORDER BY start",
+            args,
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def between(self, start: str, end: str) -> list[dict]:
+        """Активные записи с началом в [start, end]."""
+        return self._select("start >= ? AND start <= ?", (start, end))
+
+    def for_phone(self, phone: str, start: str, end: str) -> list[dict]:
+        return self._select(
+            "client_phone = ? AND start >= ? AND start <= ?", (phone, start, end)
+        )
+
+    def for_telegram_id(self, telegram_id, start: str, end: str) -> list[dict]:
+        return self._select(
+            "telegram_id = ? AND start >= ? AND start <= ?",
+            (str(telegram_id), start, end),
+        )
+
+    def stats(self) -> dict:
+        count, active = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(active), 0) FROM records"
+        ).fetchone()
+        return {
+            "records": count,
+            "active": active,
+            "sync_lag": self.sync_lag(),
+            "file_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
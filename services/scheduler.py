@@ -1,231 +1,500 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+import asyncio
+import heapq
 import logging
+import time
 import pytz
 from datetime import datetime, timedelta
 
+from services.job_store import JOB_STORE_FILE, SQLiteJobStore
+from services.notification_claims import BUSY, CLAIMS_FILE, SENT, ClaimStore
+from services.telegram_sender import get_sender
+from services.yclients import SESSION_DURATION, Record, background_lane
+
 MSK = pytz.timezone("Europe/Moscow")
+# Задания хранятся в SQLite (job store подключает start_scheduler) и вызывают
+# функции этого модуля без аргументов; bot и yclients берутся из _context
 scheduler = AsyncIOScheduler(timezone=MSK)
+_context: dict = {}
+# Страховочный refresh раз в час сверяет события ближайших NOTIFICATION_HORIZON
+NOTIFICATION_HORIZON = timedelta(hours=2)
+# Ширина корзины индекса очереди по началу записи, секунды
+BUCKET_SECONDS = 3600
 
 
-def get_custom_field(client: dict, field_name: str) -> str | None:
-    """Извлечь значение custom_field по title из списка."""
-    cf = client.get("custom_fields")
-    if not cf:
-        return None
-    if isinstance(cf, dict):
-        return cf.get(field_name)
-    if isinstance(cf, list):
-        for item in cf:
-            if isinstance(item, dict):
-                title = item.get("title", "") or item.get("name", "")
-                if title and str(title).lower() == field_name.lower():
-                    return item.get("value")
-    return None
-
-
-def start_scheduler(bot, yclients):
-    scheduler.add_job(
-        send_reminders,
-        trigger=IntervalTrigger(hours=1),
-        args=[bot, yclients],
-        id="reminders",
-        replace_existing=True,
-    )
-    scheduler.add_job(
-        send_feedback_requests,
-        trigger=IntervalTrigger(hours=1),
-        args=[bot, yclients],
-        id="feedback",
-        replace_existing=True,
-    )
+def start_scheduler(bot, yclients, job_store_file=JOB_STORE_FILE, claims_file=CLAIMS_FILE):
+    """
+    job_store_file — у каждой реплики свой: APScheduler не поддерживает
+    несколько планировщиков на одном job store. claims_file — общий для всех
+    реплик хоста (локальный диск), через него отправка каждого уведомления
+    достаётся одной.
+    """
+    _context.update(bot=bot, yclients=yclients)
+    scheduler.configure(timezone=MSK, jobstores={"default": SQLiteJobStore(job_store_file)})
+    notifications.claims = ClaimStore(claims_file)
+    yclients.add_record_listener(notifications.update)
+    notifications.start(bot)
+    jobs = {
+        "notifications_refresh": (refresh_notifications, IntervalTrigger(hours=1), 3600),
+    }
+    if yclients.record_store is not None:
+        jobs["records_sync"] = (sync_record_store, IntervalTrigger(minutes=5), 300)
+        jobs["records_verify"] = (verify_record_store, IntervalTrigger(hours=6), 3600)
     scheduler.start()
+    _sync_jobs(jobs)
+    # Догоняем события, которые наступили, пока бот был выключен
+    _context["catch_up"] = asyncio.create_task(refresh_notifications(catch_up=True))
     logging.info("✅ Scheduler started")
 
 
-async def send_reminders(bot, yclients):
+def _sync_jobs(jobs: dict) -> None:
     """
-    Раз в час проверяет записи на следующие 24 часа
-    и шлёт напоминание тем, кому ещё не отправляли.
+    Привести задания в хранилище к jobs: id -> (функция, триггер, misfire_grace_time).
+    Существующие задания не пересоздаются, чтобы не потерять их next_run_time
+    (иначе пропущенный за время простоя запуск не будет догнан).
     """
-    from services.notified_store import is_notified, mark_notified
+    for job in scheduler.get_jobs():
+        if job.id not in jobs:
+            job.remove()
+    for job_id, (func, trigger, grace) in jobs.items():
+        job = scheduler.get_job(job_id)
+        if (
+            job is not None
+            and job.func == func
+            and str(job.trigger) == str(trigger)
+            and job.misfire_grace_time == grace
+        ):
+            continue
+        scheduler.add_job(
+            func,
+            trigger=trigger,
+            id=job_id,
+            misfire_grace_time=grace,
+            coalesce=True,
+            replace_existing=True,
+        )
+
+
+def stop_scheduler():
+    notifications.stop()
+    if notifications.claims is not None:
+        notifications.claims.close()
+        notifications.claims = None
+    task = _context.pop("catch_up", None)
+    if task is not None:
+        task.cancel()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
 
-    now = datetime.now(tz=MSK)
-    target_start = now + timedelta(hours=23)
-    target_end = now + timedelta(hours=25)
 
+async def sync_record_store():
+    """Delta-синхронизация локальной копии записей."""
     try:
-        # Получить все записи студии на ближайшие 25 часов
-        # YClients: GET /records/{company_id}
-        # params: start_date, end_date (формат YYYY-MM-DD)
-        data = await yclients._request(
-            "GET",
-            f"/records/{yclients.company_id}",
-            params={
-                "start_date": (target_start - timedelta(days=1)).strftime("%Y-%m-%d"),
-                "end_date": (target_end + timedelta(days=1)).strftime("%Y-%m-%d"),
-                "count": 200,
-            },
-        )
-        records = data.get("data", [])
+        await _context["yclients"].sync_records()
     except Exception as e:
-        logging.warning(f"Scheduler: не удалось получить записи — {e}")
-        return
+        logging.warning(f"Scheduler: синхронизация записей не удалась — {e}")
 
-    for record in records:
-        try:
-            record_id = record.get("id")
-            dt_str = record.get("date")  # "YYYY-MM-DD HH:MM:SS"
-            client = record.get("client", {})
-            tg_id = client.get("custom_fields", {}).get("telegram_id")
-            client_name = client.get("name", "")
-            staff_name = (record.get("staff") or {}).get("name", "тренер")
-            service_name = ""
-            services = record.get("services", [])
-            if services:
-                service_name = services[0].get("title", "")
-
-            if not tg_id or not record_id or not dt_str:
-                continue
 
-            # Проверить попадает ли запись в окно 23–25 часов
-            dt = MSK.localize(datetime.strptime(dt_str[:19], "%Y-%m-%d %H:%M:%S"))
-            diff = (dt - now).total_seconds() / 3600
-            if not (23 <= diff <= 25):
-                continue
+async def verify_record_store():
+    """Сверка локальной копии с YClients; при расхождениях — полная синхронизация."""
+    yclients = _context["yclients"]
+    try:
+        report = await yclients.check_record_store()
+        if any(report.values()):
+            logging.warning(f"Scheduler: копия записей расходится с YClients — {report}")
+            await yclients.sync_records(full=True)
+    except Exception as e:
+        logging.warning(f"Scheduler: сверка записей не удалась — {e}")
 
-            # Не отправлять дважды
-            if is_notified(record_id, "reminder"):
-                continue
 
-            date_fmt = dt.strftime("%d.%m.%Y")
-            time_fmt = dt.strftime("%H:%M")
+class NotificationRule:
+    """
+    Правило уведомления: событие (ключ в notified_store) срабатывает в момент
+    record.<anchor> + offset (anchor: "start" или "end"); опоздавшее больше
+    чем на grace не отправляется. catch_up — допустимое опоздание для событий,
+    пропущенных за время простоя бота. send(bot, record) отправляет сообщение.
+    """
 
-            text = (
-                f"⏰ *Напоминание о тренировке в Pilates Guru*\n\n"
-                f"Завтра, {date_fmt} в {time_fmt}\n"
-                f"Тренер: {staff_name}\n"
-                f"Занятие: {service_name}\n\n"
-                f"Если нужно отменить или перенести — сделайте это "
-                f"за 20+ часов до начала."
-            )
+    __slots__ = ("event", "anchor", "offset", "grace", "catch_up", "send")
 
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="❌ Отменить/Перенести",
-                            callback_data=f"manage:{record_id}",
-                        ),
-                        InlineKeyboardButton(
-                            text="✅ Буду",
-                            callback_data=f"remind_ok:{record_id}",
-                        ),
-                    ]
-                ]
-            )
+    def __init__(
+        self,
+        event: str,
+        anchor: str,
+        offset: timedelta,
+        grace: timedelta,
+        send,
+        catch_up: timedelta | None = None,
+    ):
+        self.event = event
+        self.anchor = anchor
+        self.offset = offset
+        self.grace = grace
+        self.catch_up = grace if catch_up is None else max(grace, catch_up)
+        self.send = send
 
-            await bot.send_message(
-                chat_id=int(tg_id),
-                text=text,
-                parse_mode="Markdown",
-                reply_markup=keyboard,
-            )
-            mark_notified(record_id, "reminder")
-            logging.info(f"Reminder sent: tg_id={tg_id}, record={record_id}")
+    def fire_at(self, record: Record) -> datetime:
+        return getattr(record, self.anchor) + self.offset
 
-        except Exception as e:
-            logging.warning(f"Scheduler: ошибка при отправке напоминания — {e}")
+    def start_bounds(self, since: datetime, until: datetime) -> tuple[datetime, datetime]:
+        """Окно по началу записи для событий со временем в [since, until]."""
+        shift = self.offset + (SESSION_DURATION if self.anchor == "end" else timedelta(0))
+        return since - shift, until - shift
+
+
+NOTIFICATION_RULES: list[NotificationRule] = []
 
 
-async def send_feedback_requests(bot, yclients):
+def register_rule(rule: NotificationRule) -> NotificationRule:
+    """Добавить правило; события по нему планирует NotificationQueue."""
+    NOTIFICATION_RULES[:] = [r for r in NOTIFICATION_RULES if r.event != rule.event]
+    NOTIFICATION_RULES.append(rule)
+    return rule
+
+
+class NotificationQueue:
     """
-    Через 2 часа после окончания тренировки спрашивает как прошло.
+    Min-heap событий (время срабатывания, запись, правило). Обновляется
+    инкрементально по изменениям записей (YClientsService.add_record_listener);
+    диспетчер спит до ближайшего события — O(log n) на событие вместо
+    почасового перебора всех записей. Снимок окна сверяется по часовым
+    корзинам начала записи: стоимость пропорциональна окну, а не очереди.
     """
-    from services.notified_store import is_notified, mark_notified
-    from data.studio_info import RULES
 
-    now = datetime.now(tz=MSK)
-    # Записи которые завершились 1.5–2.5 часа назад
-    window_start = now - timedelta(hours=2, minutes=30)
-    window_end = now - timedelta(hours=1, minutes=30)
+    def __init__(self, rules: list[NotificationRule] = NOTIFICATION_RULES):
+        self.rules = rules
+        self._heap: list[tuple[float, int, tuple]] = []
+        # (record id, event) -> (время срабатывания, запись, правило, крайний срок)
+        self._entries: dict[tuple, tuple[float, Record, NotificationRule, float]] = {}
+        # Корзина начала записи -> ключи её событий в _entries
+        self._by_start: dict[int, set[tuple]] = {}
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Общие для реплик захваты (services.notification_claims); None — один процесс
+        self.claims: ClaimStore | None = None
+        self.sent = 0
+        self.missed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _bucket(record: Record) -> int:
+        return int(record.start.timestamp() // BUCKET_SECONDS)
+
+    def _set(self, key: tuple, entry: tuple) -> None:
+        current = self._entries.get(key)
+        if current is not None:
+            self._unindex(key, current[1])
+        self._entries[key] = entry
+        self._by_start.setdefault(self._bucket(entry[1]), set()).add(key)
+
+    def _drop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._unindex(key, entry[1])
+        return entry
+
+    def _unindex(self, key: tuple, record: Record) -> None:
+        bucket = self._bucket(record)
+        keys = self._by_start.get(bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_start[bucket]
+
+    def update(self, records, removed=(), window=None, catch_up: bool = False) -> None:
+        """
+        Учесть изменения записей. window=(start, end): records — полный
+        снимок окна, события записей из окна, которых нет в снимке, снимаются.
+        catch_up=True допускает опоздание до rule.catch_up вместо rule.grace.
+        """
+        from services.notified_store import is_notified
+
+        now = time.time()
+        earliest = self._heap[0][0] if self._heap else None
+        if window is not None:
+            seen = {r.id for r in records}
+            first = int(window[0].timestamp() // BUCKET_SECONDS)
+            last = int(window[1].timestamp() // BUCKET_SECONDS)
+            for bucket in range(first, last + 1):
+                for key in list(self._by_start.get(bucket, ())):
+                    record = self._entries[key][1]
+                    if record.id not in seen and window[0] <= record.start <= window[1]:
+                        self._drop(key)
+        for record_id in removed:
+            for rule in self.rules:
+                self._drop((int(record_id), rule.event))
+        for record in records:
+            for rule in self.rules:
+                key = (record.id, rule.event)
+                ts = rule.fire_at(record).timestamp()
+                lateness = rule.catch_up if catch_up else rule.grace
+                deadline = ts + lateness.total_seconds()
+                current = self._entries.get(key)
+                if current is not None and current[0] == ts:
+                    deadline = max(deadline, current[3])  # не терять окно догонки
+                if (
+                    not record.active
+                    or not record.telegram_id
+                    or deadline < now
+                    or is_notified(record.id, rule.event)
+                ):
+                    self._drop(key)
+                    continue
+                self._set(key, (ts, record, rule, deadline))
+                if current is None or current[0] != ts:
+                    self._seq += 1
+                    heapq.heappush(self._heap, (ts, self._seq, key))
+        # Записи из кучи удаляются лениво; пересобираем, когда мусора много
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                (ts, seq, key) for ts, seq, key in self._heap
+                if self._entries.get(key, (None,))[0] == ts
+            ]
+            heapq.heapify(self._heap)
+        if self._heap and (earliest is None or self._heap[0][0] < earliest):
+            self._wakeup.set()
+
+    def pop_due(self, now: float) -> list[tuple[Record, NotificationRule, float, float]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            ts, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != ts:
+                continue  # снято или перенесено
+            self._drop(key)
+            due.append(entry[1:] + (ts,))
+        return due
+
+    def next_delay(self) -> float | None:
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.time())
+
+    def start(self, bot) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(bot))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self, bot):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.next_delay())
+            except asyncio.TimeoutError:
+                pass
+            due = self.pop_due(time.time())
+            if not due:
+                continue
+            # Параллельно: темп и лимиты Telegram держит очередь отправки
+            started = time.perf_counter()
+            sent_before = self.sent
+            results = await asyncio.gather(
+                *(self._fire(bot, *item) for item in due), return_exceptions=True
+            )
+            for error in results:
+                # Одно сломанное событие не должно останавливать диспетчер
+                if isinstance(error, Exception):
+                    logging.warning(f"Scheduler: ошибка обработки события — {error!r}")
+            if len(due) > 1:
+                elapsed = time.perf_counter() - started
+                logging.info(
+                    f"Scheduler: отправлено {self.sent - sent_before} из {len(due)} "
+                    f"за {elapsed:.1f} с ({(self.sent - sent_before) / elapsed:.1f} msg/s)"
+                )
+
+    def _retry(self, record: Record, rule: NotificationRule, deadline: float, delay: float):
+        """Проверить событие ещё раз через delay секунд, если успеваем до deadline."""
+        key = (record.id, rule.event)
+        ts = time.time() + delay
+        if ts > deadline or key in self._entries:
+            return
+        self._set(key, (ts, record, rule, deadline))
+        self._seq += 1
+        heapq.heappush(self._heap, (ts, self._seq, key))
+        self._wakeup.set()
+
+    async def _fire(self, bot, record: Record, rule: NotificationRule, deadline: float, ts: float):
+        from services.notified_store import MARKER_TTL, amark_notified, is_notified
+
+        if is_notified(record.id, rule.event):
+            return
+        late = time.time() - ts
+        if time.time() > deadline:
+            self.missed += 1
+            logging.warning(
+                f"Scheduler: {rule.event} для записи {record.id} опоздал на {late:.0f} с — пропущен"
+            )
+            return
+        claims = self.claims
+        claim_key = f"{record.id}:{rule.event}"
+        if claims is not None:
+            status = await asyncio.to_thread(
+                claims.claim, claim_key, record.start.timestamp() + MARKER_TTL
+            )
+            if status == SENT:
+                # Отправила другая реплика — запоминаем локально
+                await amark_notified(record.id, rule.event, at=record.start)
+                return
+            if status == BUSY:
+                # Другая реплика отправляет; если она упадёт, захват протухнет
+                self._retry(record, rule, deadline, claims.claim_ttl)
+                return
+        try:
+            await rule.send(bot, record)
+        except Exception as e:
+            logging.warning(f"Scheduler: ошибка при отправке {rule.event} — {e}")
+            if claims is not None:
+                await asyncio.to_thread(claims.release, claim_key)
+            return
+        if claims is not None:
+            await asyncio.to_thread(claims.confirm, claim_key)
+        self.sent += 1
+        try:
+            await amark_notified(record.id, rule.event, at=record.start)
+        except Exception as e:
+            # В памяти отметка уже есть: повторной отправки из этого процесса не будет
+            logging.warning(f"Scheduler: отметка {rule.event} не записана на диск — {e}")
+        logging.info(f"{rule.event} sent: tg_id={record.telegram_id}, record={record.id}")
 
-    try:
-        data = await yclients._request(
-            "GET",
-            f"/records/{yclients.company_id}",
-            params={
-                "start_date": (window_start - timedelta(days=1)).strftime("%Y-%m-%d"),
-                "end_date": (window_end + timedelta(days=1)).strftime("%Y-%m-%d"),
-                "count": 200,
-            },
-        )
-        records = data.get("data", [])
-    except Exception as e:
-        logging.warning(f"Feedback scheduler error: {e}")
-        return
 
-    duration = RULES.get("session_duration_min", 55)
+notifications = NotificationQueue()
+
 
-    for record in records:
+async def refresh_notifications(catch_up: bool = False, queue: NotificationQueue = notifications):
+    """
+    Страховка к слушателю записей: события, срабатывающие в ближайшие
+    NOTIFICATION_HORIZON, сверяются полным снимком узкого окна каждого
+    правила (записи, изменённые мимо синхронизации). catch_up=True (при
+    старте) также берёт события, наступившие за время простоя, но не старше
+    rule.catch_up; повторы отсекает notified_store.
+    """
+    if not queue.rules:
+        return
+    now = datetime.now(tz=MSK)
+    windows = sorted(
+        rule.start_bounds(
+            now - (rule.catch_up if catch_up else rule.grace), now + NOTIFICATION_HORIZON
+        )
+        for rule in queue.rules
+    )
+    merged = [windows[0]]
+    for start, end in windows[1:]:
+        if start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    for start, end in merged:
         try:
-            record_id = record.get("id")
-            dt_str = record.get("datetime") or record.get("date")
-            client = record.get("client", {})
-            tg_id = get_custom_field(client, "telegram_id")
-            client_name = client.get("name", "")
-            staff_name = (record.get("staff") or {}).get("name", "тренера")
-
-            if not tg_id or not record_id or not dt_str:
-                continue
+            with background_lane():
+                records = [r async for r in _context["yclients"].records_between(start, end)]
+        except Exception as e:
+            logging.warning(f"Scheduler: не удалось получить записи — {e}")
+            return
+        queue.update(records, window=(start, end), catch_up=catch_up)
+    if queue.claims is not None:
+        await asyncio.to_thread(queue.claims.prune)
+    if catch_up:
+        logging.info(f"Scheduler: догонка после старта — в очереди {len(queue)} событий")
+
+
+async def _send_reminder(bot, record: Record):
+    """Напоминание за сутки до тренировки."""
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+    record_id = record.id
+    staff_name = record.staff_name or "тренер"
+    dt = record.start
+    date_fmt = dt.strftime("%d.%m.%Y")
+    time_fmt = dt.strftime("%H:%M")
+    # После догонки напоминание может уйти уже в день тренировки
+    day = "Сегодня" if dt.date() == datetime.now(tz=dt.tzinfo).date() else "Завтра"
+
+    text = (
+        f"⏰ *Напоминание о тренировке в Pilates Guru*\n\n"
+        f"{day}, {date_fmt} в {time_fmt}\n"
+        f"Тренер: {staff_name}\n"
+        f"Занятие: {record.service_title}\n\n"
+        f"Если нужно отменить или перенести — сделайте это "
+        f"за 20+ часов до начала."
+    )
 
-            dt_start = MSK.localize(
-                datetime.strptime(dt_str[:19], "%Y-%m-%d %H:%M:%S")
-            )
-            dt_end = dt_start + timedelta(minutes=duration)
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="❌ Отменить/Перенести",
+                    callback_data=f"manage:{record_id}",
+                ),
+                InlineKeyboardButton(
+                    text="✅ Буду",
+                    callback_data=f"remind_ok:{record_id}",
+                ),
+            ]
+        ]
+    )
 
-            diff = (now - dt_end).total_seconds() / 3600
-            if not (1.5 <= diff <= 2.5):
-                continue
+    await get_sender(bot).send(
+        int(record.telegram_id),
+        text,
+        parse_mode="Markdown",
+        reply_markup=keyboard,
+    )
 
-            if is_notified(record_id, "feedback"):
-                continue
 
-            first_name = client_name.split()[0] if client_name else ""
-            greeting = f", {first_name}" if first_name else ""
+async def _send_feedback_request(bot, record: Record):
+    """Через 2 часа после окончания тренировки спрашивает как прошло."""
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-            text = (
-                f"👋 Как прошла тренировка в *Pilates Guru*{greeting}?\n\n"
-                f"Занятие с тренером {staff_name} только что завершилось. "
-                f"Оцените, пожалуйста:"
-            )
+    record_id = record.id
+    client_name = record.client_name
+    staff_name = record.staff_name or "тренера"
 
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="👍 Всё отлично!",
-                            callback_data=f"feedback_good:{record_id}",
-                        ),
-                        InlineKeyboardButton(
-                            text="👎 Есть замечания",
-                            callback_data=f"feedback_bad:{record_id}",
-                        ),
-                    ]
-                ]
-            )
+    first_name = client_name.split()[0] if client_name else ""
+    greeting = f", {first_name}" if first_name else ""
 
-            await bot.send_message(
-                chat_id=int(tg_id),
-                text=text,
-                parse_mode="Markdown",
-                reply_markup=keyboard,
-            )
-            mark_notified(record_id, "feedback")
+    text = (
+        f"👋 Как прошла тренировка в *Pilates Guru*{greeting}?\n\n"
+        f"Занятие с тренером {staff_name} только что завершилось. "
+        f"Оцените, пожалуйста:"
+    )
 
-        except Exception as e:
-            logging.warning(f"Feedback send error: {e}")
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="👍 Всё отлично!",
+                    callback_data=f"feedback_good:{record_id}",
+                ),
+                InlineKeyboardButton(
+                    text="👎 Есть замечания",
+                    callback_data=f"feedback_bad:{record_id}",
+                ),
+            ]
+        ]
+    )
+
+    await get_sender(bot).send(
+        int(record.telegram_id),
+        text,
+        parse_mode="Markdown",
+        reply_markup=keyboard,
+    )
+
+
+# Напоминание — за 24 ч до начала, отзыв — через 2 ч после окончания.
+# После простоя напоминание догоняется, пока до начала остаётся 6+ часов.
+register_rule(NotificationRule(
+    "reminder", "start", -timedelta(hours=24), timedelta(hours=1), _send_reminder,
+    catch_up=timedelta(hours=18),
+))
+register_rule(NotificationRule(
+    "feedback", "end", timedelta(hours=2), timedelta(minutes=30), _send_feedback_request,
+    catch_up=timedelta(hours=2),
+))
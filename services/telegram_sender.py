@@ -0,0 +1,194 @@
+"""Очередь исходящих сообщений Telegram с лимитами на бота и на чат."""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from services.metrics import METRICS
+
+__all__ = ["TelegramSender", "close_senders", "get_sender"]
+
+# Лимиты Bot API: ~30 сообщений/с на бота и ~1/с в один чат
+GLOBAL_RATE = 30.0
+PER_CHAT_INTERVAL = 1.0
+SEND_CONCURRENCY = 8
+MAX_FLOOD_RETRIES = 3
+# Окно, по которому считается текущая пропускная способность, секунды
+THROUGHPUT_WINDOW = 60
+
+_MESSAGES_HELP = "Исходящие сообщения Telegram по результату"
+
+
+class TelegramSender:
+    """
+    Отправка через очередь и пул воркеров. Слоты времени резервируются
+    заранее (глобальный и по чату), поэтому параллельные воркеры не
+    превышают лимиты. TelegramRetryAfter приостанавливает всю отправку
+    на retry_after и повторяет сообщение.
+    """
+
+    def __init__(
+        self,
+        bot,
+        rate: float = GLOBAL_RATE,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        concurrency: int = SEND_CONCURRENCY,
+        max_retries: int = MAX_FLOOD_RETRIES,
+    ):
+        self.bot = bot
+        self.interval = 1.0 / rate
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._next_slot = 0.0
+        self._chat_next: dict[int, float] = {}
+        self._sent_times: deque[float] = deque()
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+            ]
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout) и остановить воркеры."""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    f"TelegramSender: при остановке не отправлено {self._queue.qsize()}"
+                )
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Поставить сообщение в очередь; future завершится результатом send_message."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((int(chat_id), text, kwargs, future))
+        return future
+
+    async def send(self, chat_id: int, text: str, **kwargs):
+        """Отправить через очередь и дождаться результата (исключение — при ошибке)."""
+        return await self.submit(chat_id, text, **kwargs)
+
+    def _reserve(self, chat_id: int) -> float:
+        """Зарезервировать ближайший момент отправки с учётом обоих лимитов."""
+        now = time.monotonic()
+        at = max(now, self._next_slot, self._chat_next.get(chat_id, 0.0))
+        self._next_slot = at + self.interval
+        self._chat_next[chat_id] = at + self.per_chat_interval
+        if len(self._chat_next) > 10000:
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+        return at - now
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, text, kwargs, future = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    await self._deliver(chat_id, text, kwargs, future)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, chat_id: int, text: str, kwargs: dict, future) -> None:
+        attempt = 0
+        while True:
+            delay = self._reserve(chat_id)
+            if delay:
+                await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                result = await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except TelegramRetryAfter as e:
+                self.flood_waits += 1
+                METRICS.inc(
+                    "telegram_messages_total", status="flood_wait", help=_MESSAGES_HELP
+                )
+                # Flood control касается всего бота: сдвигаем общий слот
+                self._next_slot = max(self._next_slot, time.monotonic() + e.retry_after)
+                logging.warning(f"TelegramSender: flood wait {e.retry_after} с (чат {chat_id})")
+                if attempt < self.max_retries:
+                    attempt += 1
+                    continue
+                self._finish(future, error=e)
+                return
+            except Exception as e:
+                self._finish(future, error=e)
+                return
+            METRICS.observe(
+                "telegram_send_duration_seconds", time.perf_counter() - started,
+                help="Длительность send_message, с",
+            )
+            self._finish(future, result=result)
+            return
+
+    def _finish(self, future, result=None, error=None) -> None:
+        if error is None:
+            self.sent += 1
+            self._sent_times.append(time.monotonic())
+            METRICS.inc("telegram_messages_total", status="sent", help=_MESSAGES_HELP)
+        else:
+            self.failed += 1
+            METRICS.inc("telegram_messages_total", status="failed", help=_MESSAGES_HELP)
+        if future.cancelled():
+            if error is not None:
+                logging.warning(f"TelegramSender: сообщение не отправлено — {error}")
+        elif error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def throughput(self) -> float:
+        """Сообщений в секунду за последние THROUGHPUT_WINDOW секунд."""
+        horizon = time.monotonic() - THROUGHPUT_WINDOW
+        while self._sent_times and self._sent_times[0] < horizon:
+            self._sent_times.popleft()
+        return len(self._sent_times) / THROUGHPUT_WINDOW
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "throughput": self.throughput(),
+        }
+
+    def collect_metrics(self, metrics) -> None:
+        metrics.gauge_set(
+            "telegram_send_queue_depth", self._queue.qsize(),
+            help="Сообщения в очереди на отправку",
+        )
+        metrics.gauge_set(
+            "telegram_send_throughput", self.throughput(),
+            help=f"Сообщений/с за последние {THROUGHPUT_WINDOW} с",
+        )
+
+
+_senders: dict[int, TelegramSender] = {}
+
+
+def get_sender(bot) -> TelegramSender:
+    """Общая очередь отправки для данного экземпляра Bot."""
+    sender = _senders.get(id(bot))
+    if sender is None:
+        sender = _senders[id(bot)] = TelegramSender(bot)
+        METRICS.register_collector(sender.collect_metrics)
+    return sender
+
+
+async def close_senders() -> None:
+    while _senders:
+        _, sender = _senders.popitem()
+        await sender.close()
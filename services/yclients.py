@@ -1,10 +1,104 @@
 """YClients API service for schedule and booking."""
+import asyncio
+import contextvars
+import json
 import logging
-from datetime import date, timedelta
+import random
+import re
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
 
 import aiohttp
+import pytz
 
-__all__ = ["YClientsService", "YClientsNotConfigured"]
+from data.studio_info import RULES
+from services.metrics import METRICS, SIZE_BUCKETS, path_template
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:  # orjson необязателен
+    json_loads = json.loads
+
+__all__ = [
+    "Record",
+    "YClientsService",
+    "YClientsNotConfigured",
+    "YClientsUnavailable",
+    "background_lane",
+    "get_custom_field",
+    "get_yclients",
+    "normalize_phone",
+]
+
+BASE_URL = "https://api.yclients.com/api/v1"
+STUDIO_TZ = pytz.timezone(RULES.get("timezone", "Europe/Moscow"))
+SESSION_DURATION = timedelta(minutes=RULES.get("session_duration_min", 55))
+
+# Каталог меняется редко: (ttl, max_age) в секундах.
+# После ttl отдаём устаревшую копию и обновляем в фоне, после max_age — ждём.
+CACHE_TTLS = {
+    "services": (600, 3600),
+    "staff": (600, 3600),
+}
+# Свободные слоты: короткий TTL, плюс точечный сброс после
+# create/cancel/reschedule. Даты меняются медленно — (ttl, max_age) со
+# stale-while-revalidate; времена — без него (ttl == max_age).
+AVAILABILITY_TTLS = {
+    "dates": (60, 600),
+    "times": (30, 30),
+}
+
+# Клиент по телефону: LRU на CLIENT_CACHE_SIZE номеров;
+# «не найден» кэшируется коротко, чтобы не мешать онбордингу новых клиентов
+CLIENT_CACHE_SIZE = 5000
+CLIENT_CACHE_TTL = 600
+CLIENT_NEGATIVE_TTL = 60
+
+# Локальная копия записей (services.record_store): окно синхронизации в днях,
+# допустимое отставание (сек) для чтения из копии, перекрытие delta-синхронизации
+RECORD_SYNC_DAYS_BACK = 1
+RECORD_SYNC_DAYS_AHEAD = 60
+RECORD_STORE_MAX_LAG = 900
+RECORD_SYNC_OVERLAP = 120
+# Удалённые в YClients записи не приходят в changed_after, поэтому каждая
+# delta-синхронизация целиком сверяет ближнее окно (вчера..+N дней, где
+# напоминания и отзывы) и очередной срез дальнего (весь — за ~9 синхронизаций)
+RECORD_RECONCILE_DAYS = 2
+RECORD_RECONCILE_SLICE_DAYS = 7
+
+LANES = ("interactive", "background")  # по убыванию приоритета
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "yclients_lane", default="interactive"
+)
+MAX_RATE_LIMIT_RETRIES = 3
+# Ответы больше этого размера декодируются в потоке, не блокируя event loop
+LARGE_BODY_BYTES = 128 * 1024
+
+# Таймауты по первому сегменту пути, секунды: дедлайн вызова целиком,
+# вместе с повторами и задержками между ними
+ENDPOINT_TIMEOUTS = {
+    "book_services": 5,
+    "book_staff": 5,
+    "book_dates": 5,
+    "book_times": 5,
+    "clients": 5,
+    "records": 8,
+    "book_record": 15,
+}
+DEFAULT_TIMEOUT = 10
+# Повторы только для идемпотентных GET: экспоненциальная задержка с jitter
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+# Повтор не начинается, если до дедлайна вызова осталось меньше, секунды
+MIN_ATTEMPT_TIMEOUT = 1.0
+# Circuit breaker: после N подряд неудач — быстрый отказ на reset_timeout секунд
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
 
 
 class YClientsNotConfigured(Exception):
@@ -13,39 +107,806 @@ class YClientsNotConfigured(Exception):
     pass
 
 
+class YClientsUnavailable(Exception):
+    """YClients не отвечает: запрос не удался или открыт circuit breaker."""
+
+    pass
+
+
+class _UpstreamError(Exception):
+    """Ответ 5xx от YClients (считается сбоем для повторов и breaker)."""
+
+    pass
+
+
+def normalize_phone(phone: str) -> str:
+    """Normalize phone for YClients lookup."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if len(digits) == 10 and digits[0] in "789":
+        return "+7" + digits
+    if len(digits) == 11 and digits[0] in "78":
+        return "+7" + digits[1:]
+    return "+" + digits if digits else ""
+
+
+def get_custom_field(client: dict, field_name: str) -> str | None:
+    """Извлечь значение custom_field по title из списка."""
+    cf = client.get("custom_fields")
+    if not cf:
+        return None
+    if isinstance(cf, dict):
+        return cf.get(field_name)
+    if isinstance(cf, list):
+        for item in cf:
+            if isinstance(item, dict):
+                title = item.get("title", "") or item.get("name", "")
+                if title and str(title).lower() == field_name.lower():
+                    return item.get("value")
+    return None
+
+
+@contextmanager
+def background_lane():
+    """Запросы внутри блока идут фоновой полосой лимитера (планировщик, кэш)."""
+    token = _lane.set("background")
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def _retry_after_seconds(value: str | None, default: float = 1.0) -> float:
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class _LaneTicket:
+    """Полоса, в которой запрос ждёт токен; общий GET можно повысить (promote)."""
+
+    __slots__ = ("lane", "waiter")
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.waiter: asyncio.Future | None = None
+
+
+class _RateLimiter:
+    """
+    Token bucket с приоритетными очередями: пока в очереди есть
+    interactive-запросы, background ждёт. 429 ставит весь лимитер на паузу.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queues = {lane: deque() for lane in LANES}
+        self._dispatcher: asyncio.Task | None = None
+        self._acquired = dict.fromkeys(LANES, 0)
+        self._wait_total = dict.fromkeys(LANES, 0.0)
+        self._wait_max = dict.fromkeys(LANES, 0.0)
+        self.rate_limited = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _queued(self) -> bool:
+        return any(self._queues.values())
+
+    async def acquire(self, ticket: _LaneTicket) -> None:
+        started = time.monotonic()
+        self._refill()
+        if (
+            not self._queued()
+            and self._tokens >= 1
+            and started >= self._paused_until
+        ):
+            self._tokens -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            self._queues[ticket.lane].append(fut)
+            ticket.waiter = fut
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.ensure_future(self._dispatch())
+            try:
+                await fut
+            finally:
+                ticket.waiter = None
+        # Время ожидания учитывается в полосе, в которой запрос получил токен
+        lane = ticket.lane
+        waited = time.monotonic() - started
+        self._acquired[lane] += 1
+        self._wait_total[lane] += waited
+        self._wait_max[lane] = max(self._wait_max[lane], waited)
+
+    def _next_waiter(self):
+        for lane in LANES:
+            queue = self._queues[lane]
+            while queue:
+                fut = queue.popleft()
+                if not fut.done():  # отменённые пропускаем
+                    return fut
+        return None
+
+    async def _dispatch(self) -> None:
+        while self._queued():
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            fut = self._next_waiter()
+            if fut is None:
+                break
+            self._tokens -= 1
+            fut.set_result(None)
+
+    def promote(self, ticket: _LaneTicket, lane: str) -> None:
+        """Поднять запрос в более приоритетную полосу (в т.ч. уже ждущий токен)."""
+        if LANES.index(lane) >= LANES.index(ticket.lane):
+            return
+        old, ticket.lane = ticket.lane, lane
+        fut = ticket.waiter
+        if fut is not None and not fut.done():
+            try:
+                self._queues[old].remove(fut)
+            except ValueError:
+                return
+            self._queues[lane].append(fut)
+
+    def pause(self, seconds: float) -> None:
+        """Retry-After: не выпускать запросы ближайшие seconds секунд."""
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": {
+                lane: sum(not f.done() for f in q) for lane, q in self._queues.items()
+            },
+            "acquired": dict(self._acquired),
+            "avg_wait": {
+                lane: self._wait_total[lane] / n if n else 0.0
+                for lane, n in self._acquired.items()
+            },
+            "max_wait": dict(self._wait_max),
+            "rate_limited": self.rate_limited,
+        }
+
+
+def _endpoint_timeout(path: str) -> float:
+    endpoint = path.strip("/").split("/", 1)[0]
+    return ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full jitter: случайная задержка в [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class _CircuitBreaker:
+    """closed → open после серии сбоев → half_open (одна пробная попытка)."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logging.warning(f"YClients circuit breaker: {self.state} → {state}")
+            self.state = state
+
+    def before_request(self) -> None:
+        """Пропустить запрос или сразу отказать (YClientsUnavailable)."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise YClientsUnavailable("YClients временно недоступен")
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise YClientsUnavailable("YClients временно недоступен")
+            self._probe_in_flight = True
+
+    @property
+    def allows_retry(self) -> bool:
+        return self.state == "closed"
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.failures = 0
+        self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    def release(self) -> None:
+        """Запрос завершился без вердикта (например, отменён)."""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+def _freeze_params(params) -> tuple:
+    """Хешируемый ключ из query-параметров."""
+    if not params:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+def _record_start_key(record: dict) -> str:
+    """Начало записи строкой "YYYY-MM-DD HH:MM:SS" (для сравнения)."""
+    value = record.get("date") or record.get("datetime") or ""
+    return str(value).replace("T", " ")[:19]
+
+
+def _parse_start(value) -> datetime | None:
+    """Начало записи в часовом поясе студии (строка, ISO или timestamp)."""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=STUDIO_TZ)
+    try:
+        dt = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        return STUDIO_TZ.localize(dt)
+    return dt.astimezone(STUDIO_TZ)
+
+
+def _first_dict(items) -> dict:
+    if isinstance(items, list) and items and isinstance(items[0], dict):
+        return items[0]
+    return {}
+
+
+class Record:
+    """Запись клиента: один проход нормализации ответа YClients."""
+
+    __slots__ = (
+        "id",
+        "start",
+        "end",
+        "staff_id",
+        "staff_name",
+        "service_id",
+        "service_title",
+        "client_name",
+        "client_phone",
+        "telegram_id",
+        "active",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        start: datetime,
+        staff_id=None,
+        staff_name: str = "",
+        service_id=None,
+        service_title: str = "",
+        client_name: str = "",
+        client_phone: str = "",
+        telegram_id: int | None = None,
+        active: bool = True,
+        end: datetime | None = None,
+    ):
+        self.id = id
+        self.start = start
+        self.end = end or start + SESSION_DURATION
+        self.staff_id = staff_id
+        self.staff_name = staff_name
+        self.service_id = service_id
+        self.service_title = service_title
+        self.client_name = client_name
+        self.client_phone = client_phone
+        self.telegram_id = telegram_id
+        self.active = active
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "Record | None":
+        """Record из словаря YClients или None, если нет id или даты."""
+        record_id = raw.get("id")
+        start = _parse_start(
+            raw.get("datetime") or raw.get("date") or raw.get("visit_start")
+        )
+        if not record_id or start is None:
+            return None
+        staff = raw.get("staff")
+        staff = staff if isinstance(staff, dict) else {}
+        svc = _first_dict(raw.get("services"))
+        staff_id = raw.get("staff_id") or staff.get("id")
+        service_id = svc.get("id") or raw.get("service_id")
+        # YClients records may nest in appointments
+        if not staff_id or not service_id:
+            app = _first_dict(raw.get("appointments"))
+            staff_id = staff_id or app.get("staff_id") or (app.get("staff") or {}).get("id")
+            svcs = app.get("services") or app.get("service_ids") or []
+            if svcs and not service_id:
+                s0 = svcs[0]
+                service_id = s0 if isinstance(s0, int) else (
+                    s0.get("id") if isinstance(s0, dict) else None
+                )
+        client = raw.get("client")
+        client = client if isinstance(client, dict) else {}
+        tg_id = get_custom_field(client, "telegram_id")
+        return cls(
+            id=int(record_id),
+            start=start,
+            staff_id=staff_id,
+            staff_name=staff.get("name") or raw.get("staff_name") or "",
+            service_id=service_id,
+            service_title=svc.get("title") or svc.get("booking_title") or "",
+            client_name=client.get("name") or "",
+            client_phone=normalize_phone(client.get("phone")) if client.get("phone") else "",
+            telegram_id=int(tg_id) if tg_id and str(tg_id).isdigit() else None,
+            active=bool(raw.get("active", True)) and not raw.get("deleted", False),
+        )
+
+    def to_dict(self) -> dict:
+        """JSON-совместимый вид (для FSM state)."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["start"] = self.start.isoformat()
+        data["end"] = self.end.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Record":
+        data = dict(data)
+        data["start"] = datetime.fromisoformat(data["start"])
+        data["end"] = datetime.fromisoformat(data["end"])
+        return cls(**data)
+
+    def __repr__(self) -> str:
+        return f"Record(id={self.id}, start={self.start:%Y-%m-%d %H:%M})"
+
+
+def _record_row(raw: dict) -> tuple | None:
+    """Строка для RecordStore.upsert или None, если у записи нет id/даты."""
+    record = Record.from_api(raw)
+    if record is None:
+        return None
+    return _store_row(record, raw)
+
+
+def _store_row(record: "Record", raw: dict) -> tuple:
+    return (
+        record.id,
+        record.start.strftime("%Y-%m-%d %H:%M:%S"),
+        record.client_phone or None,
+        str(record.telegram_id) if record.telegram_id else None,
+        record.active,
+        raw,
+    )
+
+
+def _error_message(data) -> str:
+    """Текст ошибки из неуспешного ответа YClients."""
+    if not isinstance(data, dict):
+        return str(data)
+    msg = (
+        data.get("meta", {}).get("message")
+        or data.get("errors", {}).get("message")
+        or str(data)
+    )
+    return str(msg) if isinstance(msg, dict) else msg
+
+
+def _sync_window() -> tuple[date, date]:
+    today = date.today()
+    return (
+        today - timedelta(days=RECORD_SYNC_DAYS_BACK),
+        today + timedelta(days=RECORD_SYNC_DAYS_AHEAD),
+    )
+
+
+class _TTLCache:
+    """Кэш с TTL, stale-while-revalidate и жёстким max_age."""
+
+    def __init__(
+        self, ttl: float, max_age: float | None = None, cache_empty: bool = False
+    ):
+        self.ttl = ttl
+        self.max_age = max(max_age if max_age is not None else ttl, ttl)
+        self.cache_empty = cache_empty
+        self._data: dict = {}  # key -> (value, stored_at)
+        self._refreshing: dict = {}  # key -> asyncio.Task
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.served_age_total = 0.0
+        self.served_age_max = 0.0
+
+    async def get(self, key, loader):
+        """Значение по ключу; loader — корутина-фабрика для загрузки."""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._track_age(age)
+                return value
+            if age < self.max_age:
+                self.stale_hits += 1
+                self._track_age(age)
+                self._refresh_in_background(key, loader)
+                return value
+        self.misses += 1
+        generation = self._generation
+        value = await loader()
+        self._store(key, value, generation)
+        return value
+
+    def _track_age(self, age: float) -> None:
+        self.served_age_total += age
+        self.served_age_max = max(self.served_age_max, age)
+
+    def _store(self, key, value, generation: int) -> None:
+        # Не кэшируем результаты, загруженные до invalidate().
+        if generation != self._generation:
+            return
+        if value or self.cache_empty:
+            self._data[key] = (value, time.monotonic())
+
+    def _refresh_in_background(self, key, loader) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+
+    async def _refresh(self, key, loader) -> None:
+        generation = self._generation
+        try:
+            with background_lane():
+                value = await loader()
+            self._store(key, value, generation)
+        except Exception as e:
+            logging.warning(f"YClients cache refresh {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def invalidate(self, key=None) -> None:
+        """Сбросить один ключ или весь кэш."""
+        self._generation += 1
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate) -> int:
+        """Сбросить ключи, для которых predicate(key) истинно. Возвращает число."""
+        self._generation += 1
+        keys = [k for k in self._data if predicate(k)]
+        for k in keys:
+            del self._data[k]
+        return len(keys)
+
+    def stats(self) -> dict:
+        served = self.hits + self.stale_hits
+        total = served + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": served / total if total else 0.0,
+            "avg_served_age": self.served_age_total / served if served else 0.0,
+            "max_served_age": self.served_age_max,
+        }
+
+
+class _LRUCache:
+    """Ограниченный LRU-кэш с TTL; None хранится с отдельным negative_ttl."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (value, expires_at)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Значение или _LRUCache._MISSING."""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return self._MISSING
+        self._data.move_to_end(key)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry[0]
+
+    def put(self, key, value) -> None:
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key=None) -> None:
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / total if total else 0.0,
+        }
+
+
 class YClientsService:
     """Сервис для работы с YClients API."""
 
-    def __init__(self, partner_token: str, user_token: str, company_id):
+    def __init__(
+        self,
+        partner_token: str,
+        user_token: str,
+        company_id,
+        pool_limit: int = 20,
+        pool_limit_per_host: int = 10,
+        rate_limit: float = 5.0,
+        rate_burst: int = 10,
+        json_decoder=None,
+        base_url: str = BASE_URL,
+    ):
         self.company_id = str(company_id)
+        self.base_url = base_url.rstrip("/")
         self._headers = {
             "Accept": "application/vnd.yclients.v2+json",
             "Content-Type": "application/json",
             "Authorization": f"Bearer {partner_token}, User {user_token}",
         }
         self._configured = bool(partner_token and user_token and company_id)
+        # Декодер JSON: bytes -> объект (по умолчанию orjson, если установлен)
+        self._json_loads = json_decoder or json_loads
+        self._pool_limit = pool_limit
+        self._pool_limit_per_host = pool_limit_per_host
+        self._session: aiohttp.ClientSession | None = None
+        self._inflight: dict = {}  # (path, params) -> (asyncio.Task, _LaneTicket) для GET
+        self._limiter = _RateLimiter(rate_limit, rate_burst)
+        self._breaker = _CircuitBreaker(
+            BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+        )
+        self._caches = {
+            name: _TTLCache(ttl, max_age)
+            for name, (ttl, max_age) in CACHE_TTLS.items()
+        }
+        self._caches.update(
+            (name, _TTLCache(ttl, max_age, cache_empty=True))
+            for name, (ttl, max_age) in AVAILABILITY_TTLS.items()
+        )
+        self._clients = _LRUCache(
+            CLIENT_CACHE_SIZE, CLIENT_CACHE_TTL, CLIENT_NEGATIVE_TTL
+        )
+        self.record_store = None  # services.record_store.RecordStore
+        self._record_sync_task: asyncio.Task | None = None
+        self._record_sync_pending = False
+        self._reconcile_cursor: date | None = None
+        self._record_listeners = []
+        # Синхронизации записей идут строго по одной
+        self._record_sync_lock = asyncio.Lock()
+        # id, отменённые ботом во время идущей синхронизации: её снимок для них устарел
+        self._records_dropped: set[int] = set()
+
+    async def start(self) -> None:
+        """Открыть общий пул соединений (keep-alive + DNS-кэш)."""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_limit,
+            limit_per_host=self._pool_limit_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self._headers,
+            timeout=aiohttp.ClientTimeout(total=15),
+        )
+
+    async def close(self) -> None:
+        """Закрыть пул соединений. Вызывается при остановке бота."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
 
     async def _request(
         self, method: str, path: str, params=None, json=None
     ) -> dict:
         if not self._configured:
             raise YClientsNotConfigured("YClients не настроен")
-        url = f"https://api.yclients.com/api/v1{path}"
-        timeout = aiohttp.ClientTimeout(total=15)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        if method != "GET":
+            return await self._send(method, path, params, json)
+        # Одинаковые GET в полёте объединяются в один запрос к API
+        key = (path, _freeze_params(params))
+        lane = _lane.get()
+        flight = self._inflight.get(key)
+        if flight is None:
+            ticket = _LaneTicket(lane)
+            task = asyncio.ensure_future(self._send(method, path, params, json, ticket))
+            self._inflight[key] = (task, ticket)
+            task.add_done_callback(lambda t: self._forget_inflight(key, t))
+        else:
+            task, ticket = flight
+            # Интерактивный запрос не ждёт в фоновой очереди вместе с общим
+            self._limiter.promote(ticket, lane)
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    def _forget_inflight(self, key, task: asyncio.Task) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # помечаем исключение как полученное
+
+    async def _send(
+        self, method: str, path: str, params=None, json=None, ticket=None
+    ) -> dict:
+        self._breaker.before_request()
+        ticket = ticket or _LaneTicket(_lane.get())
+        try:
+            data = await self._send_with_retries(method, path, params, json, ticket)
+        except (aiohttp.ClientError, asyncio.TimeoutError, _UpstreamError) as e:
+            self._breaker.record_failure()
+            raise YClientsUnavailable(f"YClients {method} {path}: {e!r}") from e
+        except BaseException:
+            self._breaker.release()
+            raise
+        self._breaker.record_success()
+        return self._parse_response(method, path, data)
+
+    async def _send_with_retries(self, method: str, path: str, params, json, ticket):
+        url = f"{self.base_url}{path}"
+        labels = {"method": method, "path": path_template(path)}
+        session = await self._get_session()
+        budget = _endpoint_timeout(path)
+        deadline = None  # отсчёт с первой попытки: очередь лимитера не в счёт
+        retries = MAX_RETRIES if method == "GET" else 0
+        attempt = 0
+        rate_limited = 0
+        while True:
+            await self._limiter.acquire(ticket)
+            if deadline is None:
+                deadline = time.monotonic() + budget
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise asyncio.TimeoutError(f"дедлайн {budget} с исчерпан")
+            timeout = aiohttp.ClientTimeout(total=left)
+            try:
+                resp, body = await self._attempt(
+                    session, method, url, params, json, timeout, labels
+                )
+                if resp.status == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                    rate_limited += 1
+                    delay = _retry_after_seconds(resp.headers.get("Retry-After"))
+                    logging.warning(f"YClients {method} {path} → 429, пауза {delay} с")
+                    self._limiter.pause(delay)
+                    continue
+                if resp.status >= 500:
+                    raise _UpstreamError(f"HTTP {resp.status}")
+                if not body.strip():  # например, 204 на DELETE
+                    return {"success": resp.status < 300, "data": None}
+                return await self._decode(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, _UpstreamError) as e:
+                if attempt >= retries or not self._breaker.allows_retry:
+                    raise
+                attempt += 1
+                delay = _backoff_delay(attempt)
+                # Таймаут съел весь дедлайн — повторять уже некогда
+                if deadline - time.monotonic() - delay < MIN_ATTEMPT_TIMEOUT:
+                    raise
+                logging.info(f"YClients {method} {path}: {e!r}, повтор через {delay:.2f} с")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _attempt(session, method, url, params, json, timeout, labels):
+        """
+        Одна попытка HTTP-запроса. Пишет метрики по шаблону пути:
+        задержку, статус (или error/timeout), размер ответа и запросы в полёте.
+        """
+        METRICS.gauge_add(
+            "yclients_requests_in_flight", 1,
+            help="Запросы к YClients в полёте", **labels,
+        )
+        started = time.perf_counter()
+        status = "error"
+        try:
             async with session.request(
-                method, url, headers=self._headers, params=params, json=json
+                method, url, params=params, json=json, timeout=timeout
             ) as resp:
-                data = await resp.json()
-                # YClients может вернуть list вместо dict (например, [] или [...])
-                if isinstance(data, list):
-                    return {"success": True, "data": data}
-                if not isinstance(data, dict):
-                    return {"success": False, "data": None}
-                if not data.get("success"):
-                    msg = data.get("meta", {}).get("message") or str(data)
-                    logging.warning(f"YClients {method} {path} → {msg}")
-                return data
+                status = str(resp.status)
+                body = await resp.read()
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            METRICS.gauge_add("yclients_requests_in_flight", -1, **labels)
+            METRICS.observe(
+                "yclients_request_duration_seconds", time.perf_counter() - started,
+                help="Длительность попытки запроса к YClients, с", **labels,
+            )
+            METRICS.inc(
+                "yclients_responses_total", status=status,
+                help="Ответы YClients по кодам статуса", **labels,
+            )
+        METRICS.observe(
+            "yclients_response_bytes", len(body), buckets=SIZE_BUCKETS,
+            help="Размер тела ответа YClients, байт", **labels,
+        )
+        return resp, body
+
+    async def _decode(self, body: bytes):
+        try:
+            if len(body) >= LARGE_BODY_BYTES:
+                return await asyncio.to_thread(self._json_loads, body)
+            return self._json_loads(body)
+        except ValueError as e:
+            raise _UpstreamError(f"некорректный JSON: {e}") from e
+
+    @staticmethod
+    def _parse_response(method: str, path: str, data) -> dict:
+        # YClients может вернуть list вместо dict (например, [] или [...])
+        if isinstance(data, list):
+            return {"success": True, "data": data}
+        if not isinstance(data, dict):
+            return {"success": False, "data": None}
+        if not data.get("success"):
+            msg = data.get("meta", {}).get("message") or str(data)
+            logging.warning(f"YClients {method} {path} → {msg}")
+            METRICS.inc(
+                "yclients_unsuccessful_total", method=method, path=path_template(path),
+                help="Ответы YClients с success=false",
+            )
+        return data
 
     async def check_connection(self) -> bool:
         """Проверка подключения к API. Возвращает True при success=True."""
@@ -87,8 +948,108 @@ class YClientsService:
             result.append(item)
         return result
 
+    def invalidate_catalog(self, name: str | None = None) -> None:
+        """Сбросить кэш каталога: "services", "staff" или оба."""
+        for cache_name in CACHE_TTLS:
+            if name is None or cache_name == name:
+                self._caches[cache_name].invalidate()
+
+    def invalidate_availability(self, staff_id=None, date: str | None = None) -> None:
+        """
+        Сбросить кэш свободных слотов тренера (по всем услугам).
+        date ("YYYY-MM-DD") сужает сброс слотов до одного дня;
+        без staff_id сбрасывается всё.
+        """
+        if staff_id is None:
+            for name in AVAILABILITY_TTLS:
+                self._caches[name].invalidate()
+            return
+        staff_key = str(staff_id)
+        # Занятый/освободившийся слот может изменить и список дат тренера
+        self._caches["dates"].invalidate_where(lambda k: k[0] == staff_key)
+        self._caches["times"].invalidate_where(
+            lambda k: k[0] == staff_key and (date is None or k[2] == date)
+        )
+
+    def breaker_stats(self) -> dict:
+        """Состояние circuit breaker и счётчики срабатываний."""
+        return self._breaker.stats()
+
+    def rate_limit_stats(self) -> dict:
+        """Глубина очередей и время ожидания по полосам лимитера."""
+        return self._limiter.stats()
+
+    def record_store_stats(self) -> dict:
+        """Размер локальной копии записей и отставание синхронизации (сек)."""
+        return self.record_store.stats() if self.record_store is not None else {}
+
+    def collect_metrics(self, metrics) -> None:
+        """Снимок состояния breaker, лимитера и кэшей в gauge (коллектор Metrics)."""
+        breaker = self._breaker.stats()
+        for state in ("closed", "open", "half_open"):
+            metrics.gauge_set(
+                "yclients_breaker_state", int(breaker["state"] == state), state=state,
+                help="Состояние circuit breaker YClients (1 — текущее)",
+            )
+        limiter = self._limiter.stats()
+        for lane, depth in limiter["queue_depth"].items():
+            metrics.gauge_set(
+                "yclients_rate_limit_queue_depth", depth, lane=lane,
+                help="Ожидающие токена лимитера запросы по полосам",
+            )
+        for lane in LANES:
+            metrics.gauge_set(
+                "yclients_rate_limit_wait_avg_seconds", limiter["avg_wait"][lane], lane=lane,
+                help="Среднее ожидание токена лимитера по полосам, с",
+            )
+            metrics.gauge_set(
+                "yclients_rate_limit_wait_max_seconds", limiter["max_wait"][lane], lane=lane,
+                help="Максимальное ожидание токена лимитера по полосам, с",
+            )
+        for name, stats in self.cache_stats().items():
+            metrics.gauge_set(
+                "yclients_cache_hit_ratio", stats["hit_rate"], cache=name,
+                help="Доля попаданий в кэш YClients",
+            )
+        store = self.record_store_stats()
+        if store:
+            metrics.gauge_set(
+                "yclients_record_store_records", store["active"],
+                help="Активные записи в локальной копии",
+            )
+            if store["sync_lag"] is not None:
+                metrics.gauge_set(
+                    "yclients_record_store_sync_lag_seconds", store["sync_lag"],
+                    help="Секунд с последней синхронизации копии записей",
+                )
+
+    def cache_stats(self) -> dict:
+        """Счётчики попаданий/промахов по каждому кэшу."""
+        stats = {name: cache.stats() for name, cache in self._caches.items()}
+        stats["clients"] = self._clients.stats()
+        return stats
+
     async def get_services(self, staff_id=None) -> list[dict]:
         """Список услуг. staff_id — опциональный фильтр. Returns flat list of dicts."""
+        return await self._caches["services"].get(
+            staff_id, lambda: self._fetch_services(staff_id)
+        )
+
+    async def warm_up(self, with_availability: bool = True) -> None:
+        """
+        Заполнить кэши каталога (и ближайших дат) и синхронизировать
+        локальную копию записей до первых запросов пользователей.
+        """
+        with background_lane():
+            services, staff = await asyncio.gather(
+                self.get_services(), self.get_staff()
+            )
+            if with_availability and services and staff:
+                await self.get_next_free_slots(staff, services)
+            if self.record_store is not None:
+                await self.sync_records()
+
+    async def _fetch_services(self, staff_id=None) -> list[dict]:
         params = {}
         if staff_id is not None:
             params["staff_id"] = staff_id
@@ -104,6 +1065,11 @@ class YClientsService:
     async def get_staff(self, service_id=None) -> list[dict]:
         """Список сотрудников (только bookable=True).
         Возвращает [{id, name, avatar, specialization}]."""
+        return await self._caches["staff"].get(
+            service_id, lambda: self._fetch_staff(service_id)
+        )
+
+    async def _fetch_staff(self, service_id=None) -> list[dict]:
         params = {}
         if service_id is not None:
             params["service_ids[]"] = service_id
@@ -128,10 +1094,21 @@ class YClientsService:
         return filtered
 
     async def get_available_dates(
-        self, staff_id: int, service_id: int
+        self, staff_id: int, service_id: int | None = None
     ) -> list[str]:
-        """Список доступных дат в формате YYYY-MM-DD."""
-        params = {"staff_id": staff_id, "service_ids[]": service_id}
+        """
+        Список доступных дат в формате YYYY-MM-DD. Без service_id — даты,
+        когда у тренера есть свободное время на любую его услугу.
+        """
+        return await self._caches["dates"].get(
+            (str(staff_id), "" if service_id is None else str(service_id)),
+            lambda: self._fetch_available_dates(staff_id, service_id),
+        )
+
+    async def _fetch_available_dates(self, staff_id, service_id=None) -> list[str]:
+        params = {"staff_id": staff_id}
+        if service_id is not None:
+            params["service_ids[]"] = service_id
         data = await self._request(
             "GET", f"/book_dates/{self.company_id}", params=params
         )
@@ -143,6 +1120,12 @@ class YClientsService:
         self, staff_id: int, date: str, service_id: int
     ) -> list[dict]:
         """Список доступных слотов: [{time, seance_length, datetime}]."""
+        return await self._caches["times"].get(
+            (str(staff_id), str(service_id), date),
+            lambda: self._fetch_available_times(staff_id, date, service_id),
+        )
+
+    async def _fetch_available_times(self, staff_id, date, service_id) -> list[dict]:
         params = {"service_ids[]": service_id}
         path = f"/book_times/{self.company_id}/{staff_id}/{date}"
         data = await self._request("GET", path, params=params)
@@ -152,6 +1135,91 @@ class YClientsService:
             result = data.get("data")
         return result if isinstance(result, list) else []
 
+    async def get_next_free_slots(
+        self,
+        staff: list[dict],
+        services: list[dict],
+        with_times: bool = False,
+        concurrency: int | None = None,
+        deadline: float = 5.0,
+    ) -> list[dict]:
+        """
+        Ближайшая свободная дата (и при with_times — первый слот) для каждого
+        тренера: один book_dates на тренера, все параллельно, не более
+        concurrency одновременно; что не успело за deadline секунд — отбрасывается.
+        Для первого слота берётся первая из services, которую тренер ведёт
+        (get_services(staff_id)). Устаревшие даты отдаются из кэша сразу,
+        обновление идёт в фоне.
+        Возвращает [{staff_id, name, service_id, date, time}] в порядке staff.
+        """
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + deadline
+        # Половина burst лимитера: нажатиям других пользователей остаются токены
+        sem = asyncio.Semaphore(concurrency or max(1, self._limiter.burst // 2))
+
+        async def bounded(coro):
+            async with sem:
+                return await coro
+
+        async def gather_until_deadline(coros: list) -> list:
+            tasks = [asyncio.ensure_future(bounded(c)) for c in coros]
+            if not tasks:
+                return []
+            done, pending = await asyncio.wait(
+                tasks, timeout=max(stop_at - loop.time(), 0)
+            )
+            for t in pending:
+                t.cancel()
+            results = []
+            for t in tasks:
+                if t in done and t.exception() is None:
+                    results.append(t.result())
+                else:
+                    if t in done:
+                        logging.warning(f"YClients availability fan-out: {t.exception()!r}")
+                    results.append(None)
+            return results
+
+        staff_ids = [st.get("id") for st in staff if st.get("id") is not None]
+        dates = await gather_until_deadline(
+            [self.get_available_dates(st_id) for st_id in staff_ids]
+        )
+        best = {st_id: min(found) for st_id, found in zip(staff_ids, dates) if found}
+
+        chosen: dict = {}  # staff_id -> service_id для первого слота
+        times: dict = {}
+        if with_times and best:
+            wanted = [sv.get("id") for sv in services if sv.get("id") is not None]
+            own = await gather_until_deadline(
+                [self.get_services(st_id) for st_id in best]
+            )
+            for st_id, items in zip(best, own):
+                own_ids = {sv.get("id") for sv in items or []}
+                sv_id = next((i for i in wanted if i in own_ids), None)
+                if sv_id is not None:
+                    chosen[st_id] = sv_id
+            slots = await gather_until_deadline(
+                [
+                    self.get_available_times(st_id, best[st_id], sv_id)
+                    for st_id, sv_id in chosen.items()
+                ]
+            )
+            for st_id, found in zip(chosen, slots):
+                if found and isinstance(found[0], dict):
+                    times[st_id] = found[0].get("time")
+
+        table = []
+        for st in staff:
+            st_id = st.get("id")
+            table.append({
+                "staff_id": st_id,
+                "name": st.get("name", ""),
+                "service_id": chosen.get(st_id),
+                "date": best.get(st_id),
+                "time": times.get(st_id),
+            })
+        return table
+
     async def create_booking(
         self,
         fullname: str,
@@ -183,6 +1251,9 @@ class YClientsService:
         data = await self._request(
             "POST", f"/book_record/{self.company_id}", json=payload
         )
+        self.invalidate_availability(staff_id, datetime_str[:10])
+        # book_record создаёт клиента, если его не было — сбросить «не найден»
+        self._clients.invalidate(normalize_phone(phone))
         if isinstance(data, dict) and data.get("success"):
             record_id = None
             inner = data.get("data")
@@ -190,22 +1261,90 @@ class YClientsService:
                 record_id = int(inner["id"])
             elif isinstance(inner, (int, float)):
                 record_id = int(inner)
+            self._request_record_sync()
             return True, "Запись создана", record_id
-        if not isinstance(data, dict):
-            return False, str(data), None
-        msg = (
-            data.get("meta", {}).get("message")
-            or data.get("errors", {}).get("message")
-            or str(data)
+        return False, _error_message(data), None
+
+    async def create_bookings(
+        self,
+        fullname: str,
+        phone: str,
+        email: str,
+        appointments: list[dict],
+        comment: str = "",
+        concurrency: int = 3,
+    ) -> list[tuple[bool, str, int | None]]:
+        """
+        Несколько записей одним запросом book_record (например, абонемент:
+        один слот на N недель). appointments: [{service_id, staff_id, datetime}].
+        Если YClients отклоняет пакет целиком (скажем, один слот уже занят),
+        записи создаются по одной, не более concurrency одновременно.
+        Возвращает (success, message, record_id) для каждой записи по порядку.
+        """
+        if not appointments:
+            return []
+        payload = {
+            "phone": phone,
+            "fullname": fullname,
+            "email": email or "noreply@pilates.local",
+            "appointments": [
+                {
+                    "id": i,
+                    "services": [int(a["service_id"])],
+                    "staff_id": int(a["staff_id"]),
+                    "datetime": a["datetime"],
+                    "comment": comment,
+                }
+                for i, a in enumerate(appointments, 1)
+            ],
+        }
+        data = await self._request(
+            "POST", f"/book_record/{self.company_id}", json=payload
+        )
+        for a in appointments:
+            self.invalidate_availability(a["staff_id"], a["datetime"][:10])
+        self._clients.invalidate(normalize_phone(phone))
+        if isinstance(data, dict) and data.get("success"):
+            # data: [{"id": <номер appointment>, "record_id": ..., "record_hash": ...}]
+            created = {}
+            for item in data.get("data") or []:
+                if isinstance(item, dict) and item.get("record_id"):
+                    created[item.get("id")] = int(item["record_id"])
+            self._request_record_sync()
+            return [
+                (True, "Запись создана", created.get(i))
+                for i in range(1, len(appointments) + 1)
+            ]
+        if len(appointments) == 1:
+            return [(False, _error_message(data), None)]
+
+        logging.info(
+            f"YClients book_record: пакет из {len(appointments)} отклонён "
+            f"({_error_message(data)}), создаём по одной"
         )
-        if isinstance(msg, dict):
-            msg = str(msg)
-        return False, msg, None
+        sem = asyncio.Semaphore(concurrency)
+
+        async def book_one(a: dict) -> tuple[bool, str, int | None]:
+            async with sem:
+                try:
+                    return await self.create_booking(
+                        fullname, phone, email,
+                        a["service_id"], a["staff_id"], a["datetime"], comment,
+                    )
+                except YClientsUnavailable as e:
+                    return False, str(e), None
+
+        return list(await asyncio.gather(*(book_one(a) for a in appointments)))
 
-    async def get_client_records(self, phone: str) -> list[dict]:
+    async def get_client_records(self, phone: str) -> list[Record]:
         """Записи клиента по телефону за период today..+30 дней."""
         today = date.today().strftime("%Y-%m-%d")
         end = (date.today() + timedelta(days=30)).strftime("%Y-%m-%d")
+        if self._record_store_fresh():
+            raws = self.record_store.for_phone(
+                normalize_phone(phone), f"{today} 00:00:00", f"{end} 23:59:59"
+            )
+            return [r for r in map(Record.from_api, raws) if r is not None]
         params = {"phone": phone, "start_date": today, "end_date": end}
         data = await self._request(
             "GET", f"/records/{self.company_id}", params=params
@@ -215,25 +1354,242 @@ class YClientsService:
         else:
             result = data.get("data")
         items = result if isinstance(result, list) else []
-        return [r for r in items if r.get("active", True)]
+        records = (Record.from_api(r) for r in items if isinstance(r, dict))
+        return [r for r in records if r is not None and r.active]
+
+    async def iter_records(
+        self,
+        start: date | datetime,
+        end: date | datetime,
+        page_size: int = 200,
+        prefetch: bool = True,
+        **filters,
+    ):
+        """
+        Все записи студии за период, постранично (async-генератор).
+        Следующая страница запрашивается, пока обрабатывается текущая
+        (prefetch). Если end — datetime, обход останавливается на первой
+        записи позже end (YClients отдаёт записи по возрастанию даты).
+        filters — дополнительные параметры /records (например, changed_after).
+        """
+        path = f"/records/{self.company_id}"
+        base = {
+            **filters,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "count": page_size,
+        }
+        stop_after = (
+            end.strftime("%Y-%m-%d %H:%M:%S") if isinstance(end, datetime) else None
+        )
+
+        async def fetch(page: int) -> list:
+            data = await self._request("GET", path, params={**base, "page": page})
+            items = data.get("data") if isinstance(data, dict) else None
+            return items if isinstance(items, list) else []
+
+        page = 1
+        pending = asyncio.ensure_future(fetch(page))
+        try:
+            while pending is not None:
+                items = await pending
+                pending = None
+                has_more = len(items) >= page_size
+                if has_more and prefetch:
+                    pending = asyncio.ensure_future(fetch(page + 1))
+                for record in items:
+                    if stop_after and _record_start_key(record) > stop_after:
+                        return
+                    yield record
+                if has_more and pending is None:
+                    pending = asyncio.ensure_future(fetch(page + 1))
+                page += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def records_between(self, start: datetime, end: datetime):
+        """
+        Активные записи (Record) с началом в [start, end], async-генератор:
+        из локальной копии, если она синхронизирована недавно, иначе из API.
+        """
+        if self._record_store_fresh():
+            raws = self.record_store.between(
+                start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+            )
+            for raw in raws:
+                record = Record.from_api(raw)
+                if record is not None:
+                    yield record
+            return
+        async for raw in self.iter_records(start, end):
+            record = Record.from_api(raw)
+            if record is not None and record.active and start <= record.start <= end:
+                yield record
+
+    def attach_record_store(self, store) -> None:
+        """Подключить локальную копию записей (services.record_store.RecordStore)."""
+        self.record_store = store
+
+    def _record_store_fresh(self) -> bool:
+        if self.record_store is None:
+            return False
+        lag = self.record_store.sync_lag()
+        return lag is not None and lag <= RECORD_STORE_MAX_LAG
 
-    async def cancel_record(self, record_id: int) -> tuple[bool, str]:
-        """Отмена записи по id."""
+    async def sync_records(self, full: bool = False) -> int:
+        """
+        Синхронизировать локальную копию записей. Первая синхронизация и
+        full=True перезагружают всё окно и удаляют исчезнувшие записи,
+        остальные запрашивают только изменённые (changed_after) и сверяют
+        целиком окна _reconcile_windows(), удаляя отменённые в YClients.
+        Возвращает число полученных записей. Синхронизации не пересекаются;
+        записи, отменённые ботом после её начала, снимок не возвращает.
+        """
+        if self.record_store is None:
+            return 0
+        async with self._record_sync_lock:
+            return await self._sync_records(full)
+
+    async def _sync_records(self, full: bool) -> int:
+        store = self.record_store
+        self._records_dropped = set()
+        started = time.time()
+        last = store.last_sync
+        filters = {}
+        if not full and last is not None:
+            changed_after = datetime.fromtimestamp(last - RECORD_SYNC_OVERLAP, timezone.utc)
+            filters["changed_after"] = changed_after.isoformat(timespec="seconds")
+        start, end = _sync_window()
+        with background_lane():
+            records, rows = await self._fetch_records(start, end, **filters)
+            if filters:
+                checked = []  # (начало, конец, id из YClients)
+                for lo, hi in self._reconcile_windows(start, end):
+                    got, got_rows = await self._fetch_records(lo, hi)
+                    records += got
+                    rows += got_rows
+                    checked.append((lo, hi, {row[0] for row in got_rows}))
+            else:
+                checked = [(start, end, {row[0] for row in rows})]
+        dropped = self._records_dropped
+        if dropped:
+            # Строки получены до отмены: не возвращаем отменённую запись в активные
+            rows = [row for row in rows if row[0] not in dropped]
+            records = [record for record in records if record.id not in dropped]
+        store.upsert(rows)
+        removed = []
+        for lo, hi, seen in checked:
+            removed += store.remove_missing(
+                f"{lo:%Y-%m-%d} 00:00:00", f"{hi:%Y-%m-%d} 23:59:59", seen
+            )
+        window = None
+        if not filters:
+            window = (
+                STUDIO_TZ.localize(datetime.combine(start, datetime.min.time())),
+                STUDIO_TZ.localize(datetime.combine(end, datetime.max.time())),
+            )
+            logging.info(f"YClients records: полная синхронизация {len(rows)}, удалено {len(removed)}")
+        elif removed:
+            logging.info(f"YClients records: удалено отменённых в YClients {len(removed)}")
+        store.set_meta("last_sync", started)
+        self._notify_record_listeners(records, removed, window=window)
+        return len(rows)
+
+    async def _fetch_records(self, start: date, end: date, **filters) -> tuple[list, list]:
+        """Записи окна: (Record, строки для RecordStore.upsert)."""
+        records, rows = [], []
+        async for raw in self.iter_records(start, end, **filters):
+            record = Record.from_api(raw)
+            if record is not None:
+                records.append(record)
+                rows.append(_store_row(record, raw))
+        return records, rows
+
+    def _reconcile_windows(self, start: date, end: date) -> list[tuple[date, date]]:
+        """Окна полной сверки для delta-синхронизации: ближнее и очередной срез дальнего."""
+        near_end = min(date.today() + timedelta(days=RECORD_RECONCILE_DAYS), end)
+        windows = [(start, near_end)]
+        lo = self._reconcile_cursor
+        if lo is None or lo <= near_end or lo > end:
+            lo = near_end + timedelta(days=1)
+        if lo <= end:
+            hi = min(lo + timedelta(days=RECORD_RECONCILE_SLICE_DAYS - 1), end)
+            windows.append((lo, hi))
+            self._reconcile_cursor = hi + timedelta(days=1)
+        return windows
+
+    def add_record_listener(self, listener) -> None:
+        """
+        listener(records, removed, window) вызывается при изменении записей:
+        records — полученные Record (в т.ч. неактивные), removed — id отменённых,
+        window — (start, end), если records — полный снимок этого окна.
+        """
+        self._record_listeners.append(listener)
+
+    def _notify_record_listeners(self, records=(), removed=(), window=None) -> None:
+        for listener in self._record_listeners:
+            try:
+                listener(list(records), list(removed), window)
+            except Exception as e:
+                logging.warning(f"YClients record listener {listener!r}: {e}")
+
+    async def check_record_store(self) -> dict:
+        """Сверить локальную копию с YClients по окну синхронизации."""
+        store = self.record_store
+        if store is None:
+            return {}
+        start, end = _sync_window()
+        upstream = {}
+        with background_lane():
+            async for record in self.iter_records(start, end):
+                row = _record_row(record)
+                if row:
+                    upstream[row[0]] = (row[1], row[4])
+        local = store.index_between(f"{start:%Y-%m-%d} 00:00:00", f"{end:%Y-%m-%d} 23:59:59")
+        return {
+            "missing": len(upstream.keys() - local.keys()),
+            "extra": len(local.keys() - upstream.keys()),
+            "mismatched": sum(
+                1 for rid, value in upstream.items()
+                if rid in local and local[rid] != value
+            ),
+        }
+
+    def _request_record_sync(self) -> None:
+        """Догнать копию записей в фоне после нашего изменения в YClients."""
+        if self.record_store is None:
+            return
+        self._record_sync_pending = True
+        if self._record_sync_task is None or self._record_sync_task.done():
+            self._record_sync_task = asyncio.ensure_future(self._run_record_syncs())
+
+    async def _run_record_syncs(self) -> None:
+        while self._record_sync_pending:
+            self._record_sync_pending = False
+            try:
+                await self.sync_records()
+            except Exception as e:
+                logging.warning(f"YClients record sync: {e}")
+
+    async def cancel_record(
+        self, record_id: int, staff_id=None, date: str | None = None
+    ) -> tuple[bool, str]:
+        """
+        Отмена записи по id. staff_id и date ("YYYY-MM-DD") отменяемой
+        записи позволяют сбросить кэш слотов точечно, иначе сбрасывается весь.
+        """
         data = await self._request(
             "DELETE", f"/records/{self.company_id}/{record_id}"
         )
+        self.invalidate_availability(staff_id, date)
         if isinstance(data, dict) and data.get("success"):
+            if self.record_store is not None:
+                self.record_store.deactivate([record_id])
+                self._records_dropped.add(int(record_id))
+            self._notify_record_listeners(removed=[record_id])
             return True, "Запись отменена"
-        if not isinstance(data, dict):
-            return False, str(data)
-        msg = (
-            data.get("meta", {}).get("message")
-            or data.get("errors", {}).get("message")
-            or str(data)
-        )
-        if isinstance(msg, dict):
-            msg = str(msg)
-        return False, msg
+        return False, _error_message(data)
 
     async def reschedule_record(
         self,
@@ -241,8 +1597,13 @@ class YClientsService:
         staff_id: int,
         service_id: int,
         new_datetime: str,
+        old_staff_id=None,
+        old_date: str | None = None,
     ) -> tuple[bool, str]:
-        """Перенос записи. new_datetime: YYYY-MM-DD HH:MM:SS."""
+        """
+        Перенос записи. new_datetime: YYYY-MM-DD HH:MM:SS.
+        old_staff_id/old_date — прежний слот, он освобождается в кэше.
+        """
         payload = {
             "appointments": [
                 {
@@ -256,21 +1617,28 @@ class YClientsService:
         data = await self._request(
             "PUT", f"/records/{self.company_id}/{record_id}", json=payload
         )
+        self.invalidate_availability(staff_id, new_datetime[:10])
+        old_staff = staff_id if old_staff_id is None else old_staff_id
+        if (str(old_staff), old_date) != (str(staff_id), new_datetime[:10]):
+            self.invalidate_availability(old_staff, old_date)
         if isinstance(data, dict) and data.get("success"):
+            # Старое время больше не действует; новое придёт с синхронизацией
+            self._notify_record_listeners(removed=[record_id])
+            self._request_record_sync()
             return True, "Перенос выполнен"
-        if not isinstance(data, dict):
-            return False, str(data)
-        msg = (
-            data.get("meta", {}).get("message")
-            or data.get("errors", {}).get("message")
-            or str(data)
-        )
-        if isinstance(msg, dict):
-            msg = str(msg)
-        return False, msg
+        return False, _error_message(data)
 
     async def get_client_by_phone(self, phone: str) -> dict | None:
-        """Клиент по телефону или None."""
+        """Клиент по телефону или None. Ответы (и «не найден») кэшируются."""
+        key = normalize_phone(phone)
+        client = self._clients.get(key)
+        if client is not _LRUCache._MISSING:
+            return client
+        client = await self._fetch_client_by_phone(phone)
+        self._clients.put(key, client)
+        return client
+
+    async def _fetch_client_by_phone(self, phone: str) -> dict | None:
         params = {"phone": phone, "fields": "id,name,phone,visits"}
         data = await self._request(
             "GET", f"/clients/{self.company_id}", params=params
@@ -282,3 +1650,34 @@ class YClientsService:
         if isinstance(result, list) and result:
             return result[0]
         return None
+
+
+_shared: YClientsService | None = None
+
+
+def get_yclients() -> YClientsService:
+    """Общий экземпляр YClientsService на весь процесс (один пул соединений)."""
+    global _shared
+    if _shared is None:
+        from config import (
+            YCLIENTS_BASE_URL,
+            YCLIENTS_COMPANY_ID,
+            YCLIENTS_POOL_LIMIT,
+            YCLIENTS_POOL_LIMIT_PER_HOST,
+            YCLIENTS_RATE_BURST,
+            YCLIENTS_RATE_LIMIT,
+            YCLIENTS_TOKEN,
+            YCLIENTS_USER_TOKEN,
+        )
+
+        _shared = YClientsService(
+            YCLIENTS_TOKEN,
+            YCLIENTS_USER_TOKEN,
+            str(YCLIENTS_COMPANY_ID),
+            pool_limit=YCLIENTS_POOL_LIMIT,
+            pool_limit_per_host=YCLIENTS_POOL_LIMIT_PER_HOST,
+            rate_limit=YCLIENTS_RATE_LIMIT,
+            rate_burst=YCLIENTS_RATE_BURST,
+            base_url=YCLIENTS_BASE_URL,
+        )
+    return _shared
@@ -0,0 +1,30 @@
+"""YClientsService против services.fake_yclients в том же event loop."""
+from contextlib import asynccontextmanager
+
+from services.fake_yclients import FakeYClients, start_server
+from services.yclients import YClientsService
+
+
+@asynccontextmanager
+async def fake_yclients(rate_limit: float = 1000.0, rate_burst: int = 1000, **fake_kwargs):
+    """yield (fake, service); лимитер по умолчанию не мешает тестам."""
+    fake_kwargs.setdefault("seed", 1)
+    fake = FakeYClients(**fake_kwargs)
+    runner, base_url = await start_server(fake)
+    service = YClientsService(
+        "partner", "user", 1,
+        base_url=base_url, rate_limit=rate_limit, rate_burst=rate_burst,
+    )
+    try:
+        yield fake, service
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+
+def record_at(fake: FakeYClients, staff_id: int, start: str) -> dict:
+    """Активная запись fake-студии у тренера на "YYYY-MM-DD HH:MM:SS"."""
+    return next(
+        r for r in fake.records.values()
+        if r["staff_id"] == staff_id and r["date"] == start and not r["deleted"]
+    )
@@ -0,0 +1,113 @@
+"""Кэш book_dates/book_times сбрасывается после create/cancel/reschedule."""
+import asyncio
+from datetime import date, timedelta
+
+from tests.fake_api import fake_yclients, record_at
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+
+def _times(slots: list[dict]) -> list[str]:
+    return [s["time"] for s in slots]
+
+
+async def _setup(fake, service):
+    staff_id = fake.staff[0]["id"]
+    other_staff_id = fake.staff[1]["id"]
+    service_id = fake.services[0]["id"]
+    for st in (staff_id, other_staff_id):
+        await service.get_available_times(st, DAY, service_id)
+        await service.get_available_dates(st, service_id)
+    return staff_id, other_staff_id, service_id
+
+
+def test_cached_times_do_not_hit_upstream():
+    async def scenario():
+        async with fake_yclients(records=0) as (fake, service):
+            staff_id, _, service_id = await _setup(fake, service)
+            before = fake.requests
+            await service.get_available_times(staff_id, DAY, service_id)
+            await service.get_available_dates(staff_id, service_id)
+            assert fake.requests == before
+            assert service.cache_stats()["times"]["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_create_booking_invalidates_taken_slot():
+    async def scenario():
+        async with fake_yclients(records=0) as (fake, service):
+            staff_id, other_staff_id, service_id = await _setup(fake, service)
+            slot = (await service.get_available_times(staff_id, DAY, service_id))[0]["time"]
+
+            ok, _, _ = await service.create_booking(
+                "Анна", "+79990000001", "", service_id, staff_id, f"{DAY} {slot}:00"
+            )
+            assert ok
+            assert slot not in _times(await service.get_available_times(staff_id, DAY, service_id))
+            # Сброс точечный: кэш другого тренера не тронут
+            assert (str(other_staff_id), str(service_id), DAY) in service._caches["times"]._data
+            assert (str(other_staff_id), str(service_id)) in service._caches["dates"]._data
+            assert (str(staff_id), str(service_id)) not in service._caches["dates"]._data
+
+    asyncio.run(scenario())
+
+
+def test_cancel_record_invalidates_freed_slot():
+    async def scenario():
+        async with fake_yclients(records=0) as (fake, service):
+            staff_id, other_staff_id, service_id = await _setup(fake, service)
+            slot = (await service.get_available_times(staff_id, DAY, service_id))[0]["time"]
+            await service.create_booking(
+                "Анна", "+79990000001", "", service_id, staff_id, f"{DAY} {slot}:00"
+            )
+            assert slot not in _times(await service.get_available_times(staff_id, DAY, service_id))
+            record = record_at(fake, staff_id, f"{DAY} {slot}:00")
+
+            ok, _ = await service.cancel_record(record["id"], staff_id, DAY)
+            assert ok
+            assert slot in _times(await service.get_available_times(staff_id, DAY, service_id))
+            assert (str(other_staff_id), str(service_id), DAY) in service._caches["times"]._data
+
+    asyncio.run(scenario())
+
+
+def test_reschedule_record_invalidates_old_and_new_slot():
+    async def scenario():
+        async with fake_yclients(records=0) as (fake, service):
+            staff_id, other_staff_id, service_id = await _setup(fake, service)
+            slots = _times(await service.get_available_times(staff_id, DAY, service_id))
+            old, new = slots[0], slots[1]
+            await service.create_booking(
+                "Анна", "+79990000001", "", service_id, staff_id, f"{DAY} {old}:00"
+            )
+            record = record_at(fake, staff_id, f"{DAY} {old}:00")
+            # Кэш видит старое время занятым, новое — свободным
+            cached = _times(await service.get_available_times(staff_id, DAY, service_id))
+            assert old not in cached and new in cached
+            await service.get_available_times(other_staff_id, DAY, service_id)
+
+            ok, _ = await service.reschedule_record(
+                record["id"], other_staff_id, service_id, f"{DAY} {new}:00",
+                old_staff_id=staff_id, old_date=DAY,
+            )
+            assert ok
+            assert old in _times(await service.get_available_times(staff_id, DAY, service_id))
+            assert new not in _times(await service.get_available_times(other_staff_id, DAY, service_id))
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_discards_fetch_started_before_it():
+    async def scenario():
+        async with fake_yclients(records=0, latency=0.05) as (fake, service):
+            staff_id = fake.staff[0]["id"]
+            service_id = fake.services[0]["id"]
+            # Загрузка началась до бронирования и вернёт уже неверный ответ
+            loading = asyncio.ensure_future(service.get_available_times(staff_id, DAY, service_id))
+            await asyncio.sleep(0.01)
+            service.invalidate_availability(staff_id, DAY)
+            await loading
+            assert (str(staff_id), str(service_id), DAY) not in service._caches["times"]._data
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+"""get_next_free_slots: запрос на тренера, лимитер по умолчанию, устаревшие даты из кэша."""
+import asyncio
+import time
+
+from tests.fake_api import fake_yclients
+
+# Лимитер как в config.py по умолчанию
+RATE_LIMIT = 5
+RATE_BURST = 10
+
+
+def test_full_table_within_limiter_budget():
+    async def scenario():
+        async with fake_yclients(
+            rate_limit=RATE_LIMIT, rate_burst=RATE_BURST, latency=0.05, records=0
+        ) as (fake, service):
+            staff, services = fake.staff, fake.services
+            started = time.monotonic()
+            table = await service.get_next_free_slots(staff, services)
+            elapsed = time.monotonic() - started
+            assert [row["staff_id"] for row in table] == [st["id"] for st in staff]
+            assert all(row["date"] for row in table)
+            assert fake.requests == len(staff)
+            assert elapsed < 1.0
+            # Ни один запрос не ждал токен: остальным пользователям хватает burst
+            assert service.rate_limit_stats()["max_wait"]["interactive"] < 0.01
+
+    asyncio.run(scenario())
+
+
+def test_with_times_uses_a_service_the_trainer_provides():
+    async def scenario():
+        async with fake_yclients(records=0) as (fake, service):
+            services = fake.services[2:4]
+            table = await service.get_next_free_slots(fake.staff, services, with_times=True)
+            for row in table:
+                assert row["service_id"] == services[0]["id"]
+                assert row["time"]
+
+    asyncio.run(scenario())
+
+
+def test_stale_dates_are_served_while_refreshing():
+    async def scenario():
+        async with fake_yclients(latency=0.2, records=0) as (fake, service):
+            await service.get_next_free_slots(fake.staff, fake.services)
+            fetched = fake.requests
+            service._caches["dates"].ttl = 0  # всё уже устарело, но моложе max_age
+
+            started = time.monotonic()
+            table = await service.get_next_free_slots(fake.staff, fake.services)
+            assert time.monotonic() - started < 0.1
+            assert all(row["date"] for row in table)
+            assert fake.requests == fetched  # обновление ещё в полёте
+
+            await asyncio.sleep(0.3)
+            assert fake.requests == fetched + len(fake.staff)
+            assert service.cache_stats()["dates"]["stale_hits"] == len(fake.staff)
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+"""Одинаковые GET в полёте объединяются в один запрос к YClients."""
+import asyncio
+
+import pytest
+
+from services import yclients as yclients_module
+from services.yclients import YClientsUnavailable
+from tests.fake_api import fake_yclients
+
+CONCURRENT = 200
+
+
+def test_200_identical_gets_make_one_upstream_request():
+    async def scenario():
+        async with fake_yclients(latency=0.05) as (fake, service):
+            path = f"/book_dates/{service.company_id}"
+            params = {"staff_id": fake.staff[0]["id"], "service_ids[]": fake.services[0]["id"]}
+            results = await asyncio.gather(
+                *(service._request("GET", path, params=dict(params)) for _ in range(CONCURRENT))
+            )
+            assert fake.requests == 1
+            assert all(r == results[0] for r in results)
+            assert results[0]["success"]
+            assert not service._inflight
+
+    asyncio.run(scenario())
+
+
+def test_different_params_are_not_coalesced():
+    async def scenario():
+        async with fake_yclients(latency=0.05) as (fake, service):
+            path = f"/book_dates/{service.company_id}"
+            await asyncio.gather(
+                *(
+                    service._request("GET", path, params={"staff_id": st["id"]})
+                    for st in fake.staff
+                    for _ in range(10)
+                )
+            )
+            assert fake.requests == len(fake.staff)
+
+    asyncio.run(scenario())
+
+
+def test_error_fans_out_to_every_waiter(monkeypatch):
+    monkeypatch.setattr(yclients_module, "BACKOFF_BASE", 0.001)
+
+    async def scenario():
+        async with fake_yclients(latency=0.02, error_rate=1.0) as (fake, service):
+            path = f"/book_services/{service.company_id}"
+            results = await asyncio.gather(
+                *(service._request("GET", path) for _ in range(CONCURRENT)),
+                return_exceptions=True,
+            )
+            assert all(isinstance(r, YClientsUnavailable) for r in results)
+            # Один общий запрос со своими повторами, а не 200 × повторы
+            assert fake.requests == 1 + yclients_module.MAX_RETRIES
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request():
+    async def scenario():
+        async with fake_yclients(latency=0.05) as (fake, service):
+            path = f"/book_staff/{service.company_id}"
+            first = asyncio.ensure_future(service._request("GET", path))
+            others = [asyncio.ensure_future(service._request("GET", path)) for _ in range(10)]
+            await asyncio.sleep(0.01)
+            first.cancel()
+            results = await asyncio.gather(*others)
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            assert all(r["success"] for r in results)
+            assert fake.requests == 1
+
+    asyncio.run(scenario())
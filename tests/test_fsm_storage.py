@@ -0,0 +1,84 @@
+"""SQLiteStorage: промах кэша не ждёт идущую запись, состояние переживает рестарт."""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+
+from services.fsm_storage import SQLiteStorage
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+def test_miss_is_not_blocked_by_pending_write(tmp_path):
+    path = tmp_path / "fsm.sqlite3"
+
+    async def scenario():
+        storage = SQLiteStorage(path, flush_interval=0.01)
+        await storage.set_state(_key(1), "Booking:confirm")
+        await storage.set_data(_key(1), {"service_id": 7})
+        while storage._dirty or storage._flushing:
+            await asyncio.sleep(0.01)
+        storage._cache.clear()
+
+        # Сброс держит блокировку соединения записи и открытую транзакцию
+        other = sqlite3.connect(path)
+        other.execute("BEGIN IMMEDIATE")
+        other.execute(
+            "INSERT INTO fsm (key, state, data, updated_at) VALUES ('x', NULL, '{}', 0)"
+        )
+        held, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with storage._lock:
+                held.set()
+                release.wait(0.5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait()
+        started = time.perf_counter()
+        state = await storage.get_state(_key(1))
+        data = await storage.get_data(_key(1))
+        elapsed = time.perf_counter() - started
+        release.set()
+        holder.join()
+        other.rollback()
+        other.close()
+        await storage.close()
+        return state, data, elapsed
+
+    state, data, elapsed = asyncio.run(scenario())
+    assert state == "Booking:confirm"
+    assert data == {"service_id": 7}
+    assert elapsed < 0.1
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / "fsm.sqlite3"
+
+    async def write():
+        storage = SQLiteStorage(path, flush_interval=60)
+        await storage.set_state(_key(1), "Booking:time")
+        await storage.set_data(_key(2), {"date": "2026-10-17"})
+        # Сброс по таймеру не успел — пишет close()
+        await storage.close()
+
+    async def read():
+        storage = SQLiteStorage(path)
+        result = (
+            await storage.get_state(_key(1)),
+            await storage.get_data(_key(2)),
+            storage.misses,
+        )
+        await storage.close()
+        return result
+
+    asyncio.run(write())
+    state, data, misses = asyncio.run(read())
+    assert state == "Booking:time"
+    assert data == {"date": "2026-10-17"}
+    assert misses == 2
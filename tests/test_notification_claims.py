@@ -0,0 +1,39 @@
+"""ClaimStore: одна отправка на хост, сетевые ФС отвергаются при открытии."""
+import time
+
+import pytest
+
+from services import notification_claims
+from services.notification_claims import BUSY, CLAIMED, SENT, ClaimStore
+
+
+def _mounts(tmp_path, monkeypatch, fstype: str):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/sda1 / ext4 rw 0 0\n"
+        f"server:/export {tmp_path / 'shared'} {fstype} rw 0 0\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(notification_claims, "MOUNTS_FILE", str(mounts))
+
+
+def test_network_filesystem_is_refused(tmp_path, monkeypatch):
+    _mounts(tmp_path, monkeypatch, "nfs4")
+    with pytest.raises(RuntimeError, match="nfs4"):
+        ClaimStore(tmp_path / "shared" / "notified.sqlite3")
+    assert not (tmp_path / "shared" / "notified.sqlite3").exists()
+
+
+def test_replicas_on_one_host_claim_once(tmp_path, monkeypatch):
+    _mounts(tmp_path, monkeypatch, "ext4")
+    path = tmp_path / "shared" / "notified.sqlite3"
+    first, second = ClaimStore(path, owner="a"), ClaimStore(path, owner="b")
+    expires = time.time() + 3600
+    try:
+        assert first.claim("1:reminder", expires) == CLAIMED
+        assert second.claim("1:reminder", expires) == BUSY
+        assert first.confirm("1:reminder")
+        assert second.claim("1:reminder", expires) == SENT
+    finally:
+        first.close()
+        second.close()
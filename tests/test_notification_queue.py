@@ -0,0 +1,94 @@
+"""NotificationQueue: снимок окна сверяется по корзинам, refresh — узкие окна правил."""
+import asyncio
+import importlib
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import notified_store
+from services import scheduler as scheduler_module
+from services.scheduler import NOTIFICATION_HORIZON, NotificationQueue, NotificationRule
+from services.yclients import STUDIO_TZ, Record
+
+QUEUED = 100_000
+
+
+async def _noop(bot, record):
+    pass
+
+
+def _rules() -> list[NotificationRule]:
+    return [
+        NotificationRule("reminder", "start", -timedelta(hours=24), timedelta(hours=1), _noop),
+        NotificationRule("feedback", "end", timedelta(hours=2), timedelta(minutes=30), _noop),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path):
+    """notified_store во временном каталоге: отправленных отметок нет."""
+    importlib.reload(notified_store).set_path(tmp_path / "notified.json")
+
+
+def _records(now: datetime, count: int, step: timedelta) -> list[Record]:
+    base = now + timedelta(days=2)
+    return [Record(id=i, start=base + step * i, telegram_id=1000 + i) for i in range(count)]
+
+
+def test_window_snapshot_drops_only_missing_records_inside_it():
+    queue = NotificationQueue(rules=_rules())
+    now = datetime.now(STUDIO_TZ)
+    records = _records(now, 48, timedelta(hours=1))
+    queue.update(records)
+    assert len(queue) == 96
+
+    # Окно из трёх часов: запись 11 исчезла, 12 перенесена за окно, 10 осталась
+    window = (records[10].start, records[12].start)
+    moved = Record(id=12, start=records[40].start + timedelta(minutes=30), telegram_id=1012)
+    queue.update([records[10]], window=window)
+    queue.update([moved])
+
+    keys = set(queue._entries)
+    assert (11, "reminder") not in keys and (11, "feedback") not in keys
+    assert queue._entries[(12, "reminder")][1] is moved
+    assert (10, "reminder") in keys and (13, "reminder") in keys
+    assert len(queue) == 94
+    indexed = {key for keys in queue._by_start.values() for key in keys}
+    assert indexed == keys
+
+
+def test_window_update_cost_does_not_grow_with_queue():
+    queue = NotificationQueue(rules=_rules())
+    now = datetime.now(STUDIO_TZ)
+    records = _records(now, QUEUED // 2, timedelta(minutes=1))
+    queue.update(records)
+    assert len(queue) == QUEUED
+
+    started = time.perf_counter()
+    for i in range(200):
+        window = records[i * 60].start, records[i * 60 + 59].start
+        queue.update(records[i * 60: i * 60 + 60], window=window)
+    elapsed = time.perf_counter() - started
+    # Перебор всей очереди на каждое окно — секунды
+    assert elapsed < 1.0
+    assert len(queue) == QUEUED
+
+
+def test_refresh_reads_narrow_window_per_rule(monkeypatch):
+    calls = []
+
+    class _Records:
+        async def records_between(self, start, end):
+            calls.append((start, end))
+            return
+            yield
+
+    monkeypatch.setitem(scheduler_module._context, "yclients", _Records())
+    queue = NotificationQueue(rules=_rules())
+    asyncio.run(scheduler_module.refresh_notifications(queue=queue))
+
+    # Напоминания и отзывы — два окна ~ NOTIFICATION_HORIZON + grace, а не общее на ~30 ч
+    assert len(calls) == 2
+    for start, end in calls:
+        assert end - start <= NOTIFICATION_HORIZON + timedelta(hours=1)
@@ -0,0 +1,143 @@
+"""Фоновая запись notified_store: задержка event loop и устойчивость writer."""
+import asyncio
+import importlib
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import notified_store
+from services.scheduler import NotificationQueue, NotificationRule
+from services.yclients import STUDIO_TZ, Record
+
+BURST = 1000
+# Задержка send_message, с: отправки идут параллельно, отметки — пачками
+SEND_LATENCY = 0.02
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Чистый notified_store с файлами во временном каталоге."""
+    module = importlib.reload(notified_store)
+    module.set_path(tmp_path / "notified.json")
+    return module
+
+
+def _log_lines(store) -> list[str]:
+    return store.LOG_FILE.read_text(encoding="utf-8").splitlines()
+
+
+async def _measure_lag(until, interval: float = 0.001, timeout: float = 30) -> list[float]:
+    """Задержки тиков interval, пока until() ложно."""
+    lags = []
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    return lags
+
+
+def test_event_loop_lag_during_1000_reminder_burst(store):
+    async def send(bot, record):
+        await asyncio.sleep(SEND_LATENCY * (record.id % 10) / 5)
+
+    async def scenario():
+        store.start_writer("batch")
+        rule = NotificationRule("reminder", "start", timedelta(0), timedelta(hours=1), send)
+        queue = NotificationQueue(rules=[rule])
+        now = datetime.now(STUDIO_TZ)
+        queue.update([
+            Record(id=i, start=now - timedelta(seconds=1), telegram_id=100000 + i)
+            for i in range(BURST)
+        ])
+        queue.start(bot=None)
+        lags = await _measure_lag(lambda: queue.sent == BURST)
+        queue.stop()
+        await store.close()
+        return queue, sorted(lags)
+
+    queue, lags = asyncio.run(scenario())
+    assert queue.sent == BURST
+    assert len(lags) > 10
+    p99 = lags[int(len(lags) * 0.99)]
+    # Старый синхронный store держал цикл секундами (полная перезапись на отметку)
+    assert p99 < 0.05
+    assert len(_log_lines(store)) == BURST
+    assert all(store.is_notified(i, "reminder") for i in range(BURST))
+
+
+def test_compaction_failure_does_not_stop_writer(store, monkeypatch):
+    monkeypatch.setattr(store, "COMPACT_EVERY", 5)
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    async def scenario():
+        store.start_writer("batch")
+        with monkeypatch.context() as m:
+            # Сворачивание закрывает журнал и падает на переименовании
+            m.setattr(store.os, "replace", broken_replace)
+            for i in range(20):
+                await asyncio.wait_for(store.amark_notified(i, "reminder"), 2)
+        for i in range(20, 30):
+            await asyncio.wait_for(store.amark_notified(i, "reminder"), 2)
+        assert store._writer is not None and not store._writer._task.done()
+        await asyncio.wait_for(store.close(), 2)
+
+    path = store.STORE_FILE
+    asyncio.run(scenario())
+    # Всё записанное переживает перезапуск
+    importlib.reload(notified_store)
+    notified_store.set_path(path)
+    assert all(notified_store.is_notified(i, "reminder") for i in range(30))
+
+
+def test_writer_compacts_off_the_event_loop(store, monkeypatch):
+    monkeypatch.setattr(store, "COMPACT_EVERY", 10)
+    replace = store.os.replace
+    threads = set()
+
+    def tracked_replace(src, dst):
+        threads.add(threading.current_thread())
+        replace(src, dst)
+
+    monkeypatch.setattr(store.os, "replace", tracked_replace)
+
+    async def scenario():
+        store.start_writer("batch")
+        for i in range(25):
+            await asyncio.wait_for(store.amark_notified(i, "reminder"), 2)
+        await asyncio.wait_for(store.close(), 2)
+
+    path = store.STORE_FILE
+    asyncio.run(scenario())
+    # Переименование журнала и замена снимка — только в потоке writer
+    assert threads and threading.main_thread() not in threads
+    assert len(_log_lines(store)) == 5
+    importlib.reload(notified_store)
+    notified_store.set_path(path)
+    assert all(notified_store.is_notified(i, "reminder") for i in range(25))
+
+
+def test_dead_writer_fails_over_instead_of_hanging(store, monkeypatch):
+    async def broken_flush(self, lines, futures):
+        raise RuntimeError("writer bug")
+
+    async def scenario():
+        store.start_writer("interval", 0.5)
+        first = store._writer
+        with monkeypatch.context() as m:
+            m.setattr(store._Writer, "_flush", broken_flush)
+            marks = [asyncio.ensure_future(store.amark_notified(i, "reminder")) for i in range(5)]
+            results = await asyncio.wait_for(asyncio.gather(*marks, return_exceptions=True), 2)
+        assert any(isinstance(r, RuntimeError) for r in results)
+        assert first._task.done() and store._writer is None
+        # Следующая отметка запускает новый writer с прежним режимом
+        await asyncio.wait_for(store.amark_notified(99, "reminder"), 2)
+        assert store._writer is not first and store._writer.durability == "interval"
+        await asyncio.wait_for(store.close(), 2)
+
+    asyncio.run(scenario())
+    assert "99:reminder" in " ".join(_log_lines(store))
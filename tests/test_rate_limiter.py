@@ -0,0 +1,74 @@
+"""Приоритет интерактивной полосы лимитера и экспорт времени ожидания."""
+import asyncio
+
+from services.metrics import Metrics
+from services.yclients import background_lane
+from tests.fake_api import fake_yclients
+
+
+async def _get(service, params, done: list, lane: str = "interactive"):
+    path = f"/book_services/{service.company_id}"
+    if lane == "background":
+        with background_lane():
+            await service._request("GET", path, params=params)
+    else:
+        await service._request("GET", path, params=params)
+    done.append((lane, params["n"]))
+
+
+def test_interactive_preempts_queued_background():
+    async def scenario():
+        async with fake_yclients(rate_limit=20, rate_burst=1) as (fake, service):
+            done = []
+            tasks = [
+                asyncio.ensure_future(_get(service, {"n": i}, done, "background"))
+                for i in range(5)
+            ]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.ensure_future(_get(service, {"n": 99}, done)))
+            await asyncio.gather(*tasks)
+            # Первый фоновый забрал токен burst, дальше — интерактивный
+            assert done[:2] == [("background", 0), ("interactive", 99)]
+
+    asyncio.run(scenario())
+
+
+def test_interactive_joining_background_flight_is_promoted():
+    async def scenario():
+        async with fake_yclients(rate_limit=20, rate_burst=1) as (fake, service):
+            done = []
+            tasks = [
+                asyncio.ensure_future(_get(service, {"n": i}, done, "background"))
+                for i in range(5)
+            ]
+            # Фоновый запрос в конце очереди, к нему присоединяется нажатие пользователя
+            tasks.append(asyncio.ensure_future(_get(service, {"n": 7}, done, "background")))
+            await asyncio.sleep(0)
+            tasks.append(asyncio.ensure_future(_get(service, {"n": 7}, done)))
+            await asyncio.gather(*tasks)
+            order = [n for _, n in done]
+            assert order.index(7) == 1
+            assert fake.requests == 6  # общий запрос по-прежнему один
+            stats = service.rate_limit_stats()
+            assert stats["acquired"] == {"interactive": 1, "background": 5}
+
+    asyncio.run(scenario())
+
+
+def test_wait_times_are_exported():
+    async def scenario():
+        async with fake_yclients(rate_limit=20, rate_burst=1) as (fake, service):
+            done = []
+            await asyncio.gather(
+                *(_get(service, {"n": i}, done, "background") for i in range(3))
+            )
+            metrics = Metrics()
+            service.collect_metrics(metrics)
+            text = metrics.render()
+            assert 'yclients_rate_limit_wait_avg_seconds{lane="background"}' in text
+            assert 'yclients_rate_limit_wait_max_seconds{lane="interactive"} 0.0' in text
+            max_wait = service.rate_limit_stats()["max_wait"]["background"]
+            assert f'yclients_rate_limit_wait_max_seconds{{lane="background"}} {max_wait!r}' in text
+            assert max_wait > 0.05
+
+    asyncio.run(scenario())
@@ -0,0 +1,125 @@
+"""Локальная копия записей: delta-синхронизация видит отмены, сделанные прямо в YClients."""
+import asyncio
+from datetime import date, datetime, timedelta
+
+from services.metrics import Metrics
+from services.record_store import RecordStore
+from services.yclients import RECORD_RECONCILE_DAYS, STUDIO_TZ
+from tests.fake_api import fake_yclients
+
+
+def _delete_upstream(fake, record: dict) -> None:
+    """Отмена в интерфейсе YClients, мимо бота."""
+    record["deleted"] = True
+    record["last_change_date"] = datetime.now(STUDIO_TZ).isoformat()
+
+
+def _first_on(fake, day: date) -> dict:
+    return min(
+        (r for r in fake.records.values() if r["date"].startswith(day.isoformat()) and not r["deleted"]),
+        key=lambda r: r["date"],
+    )
+
+
+def test_delta_sync_drops_records_deleted_upstream(tmp_path):
+    async def scenario():
+        async with fake_yclients(records=300) as (fake, service):
+            service.attach_record_store(RecordStore(tmp_path / "records.sqlite3"))
+            removed_seen = []
+            service.add_record_listener(lambda records, removed, window: removed_seen.extend(removed))
+            await service.sync_records()
+
+            record = _first_on(fake, date.today() + timedelta(days=1))
+            _delete_upstream(fake, record)
+            await service.sync_records()  # delta
+
+            day = record["date"][:10]
+            index = service.record_store.index_between(f"{day} 00:00:00", f"{day} 23:59:59")
+            assert record["id"] not in index
+            start = STUDIO_TZ.localize(datetime.fromisoformat(f"{day} 00:00:00"))
+            ids = [r.id async for r in service.records_between(start, start + timedelta(days=1))]
+            assert record["id"] not in ids
+            assert record["id"] in removed_seen
+            assert await service.check_record_store() == {"missing": 0, "extra": 0, "mismatched": 0}
+            service.record_store.close()
+
+    asyncio.run(scenario())
+
+
+def test_far_window_is_reconciled_by_rotating_slices(tmp_path):
+    async def scenario():
+        async with fake_yclients(records=300) as (fake, service):
+            service.attach_record_store(RecordStore(tmp_path / "records.sqlite3"))
+            await service.sync_records()
+            far = _first_on(fake, date.today() + timedelta(days=RECORD_RECONCILE_DAYS + 8))
+            _delete_upstream(fake, far)
+            for _ in range(10):
+                await service.sync_records()
+            day = far["date"][:10]
+            assert far["id"] not in service.record_store.index_between(
+                f"{day} 00:00:00", f"{day} 23:59:59"
+            )
+            service.record_store.close()
+
+    asyncio.run(scenario())
+
+
+def test_sync_lag_is_exported(tmp_path):
+    async def scenario():
+        async with fake_yclients(records=10) as (fake, service):
+            service.attach_record_store(RecordStore(tmp_path / "records.sqlite3"))
+            await service.sync_records()
+            metrics = Metrics()
+            service.collect_metrics(metrics)
+            text = metrics.render()
+            assert "yclients_record_store_sync_lag_seconds " in text
+            assert "yclients_record_store_records " in text
+            service.record_store.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_during_sync_is_not_resurrected(tmp_path):
+    async def scenario():
+        async with fake_yclients(records=300) as (fake, service):
+            service.attach_record_store(RecordStore(tmp_path / "records.sqlite3"))
+            await service.sync_records()
+            record = _first_on(fake, date.today() + timedelta(days=1))
+            active = service.record_store.stats()["active"]
+            seen_active = []
+            service.add_record_listener(
+                lambda records, removed, window: seen_active.extend(
+                    r.id for r in records if r.active
+                )
+            )
+
+            # Снимок ближнего окна уже получен, отмена приходит до его записи
+            fetch = service._fetch_records
+            fetched, release = asyncio.Event(), asyncio.Event()
+
+            async def paused_fetch(start, end, **filters):
+                result = await fetch(start, end, **filters)
+                if not filters and not fetched.is_set():
+                    fetched.set()
+                    await release.wait()
+                return result
+
+            service._fetch_records = paused_fetch
+            sync = asyncio.create_task(service.sync_records())
+            await fetched.wait()
+            assert (await service.cancel_record(record["id"]))[0]
+            release.set()
+            await sync
+            # Параллельная синхронизация ждёт текущую, а не идёт поверх неё
+            await asyncio.gather(service.sync_records(), service.sync_records())
+
+            day = record["date"][:10]
+            start = STUDIO_TZ.localize(datetime.fromisoformat(f"{day} 00:00:00"))
+            ids = [r.id async for r in service.records_between(start, start + timedelta(days=1))]
+            assert record["id"] not in ids
+            assert record["id"] not in seen_active
+            assert service.record_store.stats()["active"] == active - 1
+            assert await service.check_record_store() == {"missing": 0, "extra": 0, "mismatched": 0}
+            service.record_store.close()
+
+    asyncio.run(scenario())
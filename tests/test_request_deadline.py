@@ -0,0 +1,52 @@
+"""Дедлайн вызова: повторы и задержки между ними укладываются в таймаут эндпоинта."""
+import asyncio
+import time
+
+from services import yclients as yclients_module
+from services.yclients import YClientsUnavailable
+from tests.fake_api import fake_yclients
+
+BUDGET = 0.5
+
+
+def _slow_endpoint(monkeypatch):
+    monkeypatch.setitem(yclients_module.ENDPOINT_TIMEOUTS, "book_dates", BUDGET)
+    monkeypatch.setattr(yclients_module, "MIN_ATTEMPT_TIMEOUT", 0.1)
+    monkeypatch.setattr(yclients_module, "BACKOFF_BASE", 0.001)
+
+
+def test_timeout_is_not_retried_past_deadline(monkeypatch):
+    _slow_endpoint(monkeypatch)
+
+    async def scenario():
+        async with fake_yclients(latency=BUDGET * 4, records=0) as (fake, service):
+            started = time.perf_counter()
+            try:
+                await service._request("GET", f"/book_dates/{service.company_id}")
+            except YClientsUnavailable:
+                pass
+            else:
+                raise AssertionError("ожидался YClientsUnavailable")
+            return time.perf_counter() - started, fake.requests
+
+    elapsed, requests = asyncio.run(scenario())
+    # Раньше: BUDGET × (1 + MAX_RETRIES) плюс задержки
+    assert elapsed < BUDGET * 1.5
+    assert requests == 1
+
+
+def test_fast_failures_are_retried_within_deadline(monkeypatch):
+    _slow_endpoint(monkeypatch)
+
+    async def scenario():
+        async with fake_yclients(latency=0.01, error_rate=1.0, records=0) as (fake, service):
+            started = time.perf_counter()
+            try:
+                await service._request("GET", f"/book_dates/{service.company_id}")
+            except YClientsUnavailable:
+                pass
+            return time.perf_counter() - started, fake.requests
+
+    elapsed, requests = asyncio.run(scenario())
+    assert elapsed < BUDGET
+    assert requests == 1 + yclients_module.MAX_RETRIES
@@ -0,0 +1,40 @@
+"""start_scheduler: job store реплики и общий файл захватов — по заданным путям."""
+import asyncio
+import sqlite3
+
+from services import scheduler as scheduler_module
+
+
+class _StubYClients:
+    record_store = object()
+
+    def add_record_listener(self, listener):
+        pass
+
+    async def records_between(self, start, end):
+        return
+        yield
+
+
+def test_job_store_is_per_replica_and_claims_are_shared(tmp_path):
+    replica_dir = tmp_path / "replica-1"
+    shared = tmp_path / "shared" / "notified.sqlite3"
+
+    async def scenario():
+        scheduler_module.start_scheduler(
+            None, _StubYClients(),
+            job_store_file=replica_dir / "scheduler.sqlite3", claims_file=shared,
+        )
+        try:
+            assert scheduler_module.notifications.claims.path == shared
+            await asyncio.sleep(0)
+        finally:
+            scheduler_module.stop_scheduler()
+
+    asyncio.run(scenario())
+    db = sqlite3.connect(replica_dir / "scheduler.sqlite3")
+    jobs = {row[0] for row in db.execute("SELECT id FROM apscheduler_jobs")}
+    db.close()
+    assert jobs == {"notifications_refresh", "records_sync", "records_verify"}
+    assert shared.exists()
+    assert str(scheduler_module.scheduler.timezone) == "Europe/Moscow"